@@ -1,24 +1,17 @@
 
 import streamlit as st
 import pandas as pd
-from st_aggrid import AgGrid, GridOptionsBuilder, GridUpdateMode
 from datetime import date
-from utils.auth import get_gspread_client
+from utils.grid import paged_grid
+from utils.sheets import invalidate_tab, load_tab, render_quarantine
+from utils.writeback import save_grid_edits
+from utils.write_queue import queue_row
 
 def render_bank_statements():
     SHEET_KEY = "1RJPEK_ye59vA8ngWiTUYkJZ-xOc815TyKsQ3-f6u4kk"
     TAB_NAME = "List of A/C"
 
-    @st.cache_data(ttl=60)
-    def load_data():
-        client = get_gspread_client()
-        sheet = client.open_by_key(SHEET_KEY)
-        ws = sheet.worksheet(TAB_NAME)
-        df = pd.DataFrame(ws.get_all_records())
-        return df, ws
-
-    df, worksheet = load_data()
-    df.columns = [str(col).strip().title() for col in df.columns]
+    df = load_tab(SHEET_KEY, TAB_NAME)
 
     st.subheader("📄 Add Bank Account")
 
@@ -43,33 +36,24 @@ def render_bank_statements():
             "Concession USD": round(concession_usd, 2),
             "Concession NGN": round(concession_ngn, 2)
         }
-        safe_row = [[str(v) if pd.isna(v) else v for v in new_row.values()]]
-        worksheet.append_rows(safe_row)
-        st.success("✅ Bank record submitted!")
-        st.rerun()
+        safe_row = [str(v) if pd.isna(v) else v for v in new_row.values()]
+        queue_row(SHEET_KEY, TAB_NAME, safe_row)
+        st.success("✅ Bank record queued for saving.")
+
+    render_quarantine(SHEET_KEY, TAB_NAME)
 
     st.markdown("### 📋 Bank Account Table")
     col_refresh, _ = st.columns([1, 9])
     with col_refresh:
         if st.button("🔄 Refresh Data", key="bank_refresh_btn"):
-            st.cache_data.clear()
+            invalidate_tab(SHEET_KEY, TAB_NAME)
             st.rerun()
 
     if not df.empty:
-        gb = GridOptionsBuilder.from_dataframe(df)
-        gb.configure_pagination()
-        gb.configure_default_column(editable=True, filter=True, resizable=True)
-        grid_response = AgGrid(
-            df,
-            gridOptions=gb.build(),
-            update_mode=GridUpdateMode.VALUE_CHANGED,
-            fit_columns_on_grid_load=True,
-            height=400
-        )
+        page, grid_response = paged_grid(df, key="bank_statements", height=400)
 
         updated_df = grid_response["data"]
-        if not updated_df.equals(df):
-            worksheet.update([updated_df.columns.values.tolist()] + updated_df.values.tolist())
+        if save_grid_edits(SHEET_KEY, TAB_NAME, page, updated_df):
             st.success("✅ Table updates saved.")
     else:
         st.info("ℹ️ No data found in Bank Statements sheet.")
@@ -1,5 +1,6 @@
 import streamlit as st
 from utils.auth import app_login, check_access, logout
+from utils.write_queue import render_write_status
 
 # --- Page Setup ---
 st.set_page_config(page_title="Trade Sheet Menu", layout="wide")
@@ -12,6 +13,9 @@ if not check_access("trade_sheet"):
     st.stop()
 logout("trade_sheet")
 
+# --- Queued Submissions (filled in once the forms below have run) ---
+write_status = st.container()
+
 # --- Tabs ---
 tab1, tab2, tab3, tab4 = st.tabs([
     "🛒 Purchase Trade", 
@@ -42,3 +46,6 @@ with tab3:
 with tab4:
     st.markdown("### 🔁 Swap Trade")
     render_swap_trade()
+
+with write_status:
+    render_write_status()
@@ -1,6 +1,7 @@
 
 import streamlit as st
 from utils.auth import app_login, check_access, logout
+from utils.write_queue import render_write_status
 
 # --- PAGE CONFIG ---
 st.set_page_config(page_title="Daily Transactions", layout="wide")
@@ -13,6 +14,9 @@ if not check_access("daily_transaction"):
     st.stop()
 logout("daily_transaction")
 
+# --- QUEUED SUBMISSIONS (filled in once the forms below have run) ---
+write_status = st.container()
+
 # --- SUBMODULE TABS ---
 tab1, tab2, tab3 = st.tabs([
     "📌 At a Glance",
@@ -31,3 +35,6 @@ with tab2:
 with tab3:
     from pages.daily_transaction.expenses_module import render_expenses
     render_expenses()
+
+with write_status:
+    render_write_status()
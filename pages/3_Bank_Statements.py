@@ -1,9 +1,13 @@
 import streamlit as st
 from bank_statements_tab import render_bank_statements
+from utils.write_queue import render_write_status
 
 st.set_page_config(page_title="Bank Statements", layout="wide")
 st.title("🏦 Bank Statement Module")
 
+# Filled in once the forms below have run
+write_status = st.container()
+
 tab1, tab2 = st.tabs(["📄 Bank Statements", "💰 Bank Balance"])
 
 with tab1:
@@ -11,3 +15,6 @@ with tab1:
 
 with tab2:
     st.info("💡 Bank Balance tab coming soon...")
+
+with write_status:
+    render_write_status()
@@ -1,5 +1,6 @@
 import streamlit as st
 from utils.auth import check_access, logout
+from utils.sheets import add_row_ids, tabs_without_row_ids
 
 st.set_page_config(page_title="Database", layout="wide")
 
@@ -23,3 +24,20 @@ with tab2:
 with tab3:
     from pages.database.transaction_type_module import render_transaction_type
     render_transaction_type()
+
+# --- SHEET MAINTENANCE ---
+# Adding row IDs changes the live sheets, so it only ever happens from here
+missing_ids = tabs_without_row_ids()
+if missing_ids:
+    with st.expander(f"🛠️ {len(missing_ids)} tab(s) have no row IDs"):
+        st.caption("Adds a hidden ID column after the last header and gives every existing row an ID, "
+                   "so table edits always map back to the right row.")
+        labels = {tab: (sheet_key, tab) for sheet_key, tab in missing_ids}
+        tab_name = st.selectbox("Tab", list(labels), key="row_ids_tab")
+        if st.button("Add row IDs", key="row_ids_add"):
+            try:
+                count = add_row_ids(*labels[tab_name])
+            except Exception as e:
+                st.error(f"Could not add row IDs to {tab_name}: {e}")
+            else:
+                st.success(f"Added row IDs to {count} row(s) of {tab_name}.")
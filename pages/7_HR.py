@@ -1,15 +1,11 @@
 import streamlit as st
 from utils.auth import check_access, logout
+from pages.hr.mailer import FAILED, Mailer, build_message
+from pages.hr.payroll import REQUIRED_COLUMNS, ingest_payroll, missing_columns
+from pages.hr.payslips import build_payslip_bundle, bundle_bytes, payslip_records, render_payslips
 import pandas as pd
 import datetime
-from fpdf import FPDF
-import base64
 from io import BytesIO
-import requests
-import smtplib
-from email.message import EmailMessage
-import tempfile
-import os
 
 # --- AUTH FOR HR PAGE ---
 if not check_access("hr"):
@@ -33,15 +29,6 @@ with tab1:
     SMTP_PORT = 587
 
     # --- UTILS ---
-    def format_currency(amount):
-        return f"{amount:,.2f}"
-
-    def safe_float(val):
-        try:
-            return float(val)
-        except:
-            return 0.0
-
     def load_data(uploaded_file):
         if uploaded_file.name.endswith('.csv'):
             return pd.read_csv(uploaded_file)
@@ -51,118 +38,17 @@ with tab1:
             st.error("Unsupported file format. Please upload a CSV or Excel file.")
             return None
 
-    # --- PDF GENERATOR ---
-    def generate_pdf(data):
-        pdf = FPDF()
-        pdf.add_page()
-
-        # Add background letterhead image
-        letterhead_url = "https://drive.google.com/file/d/1vTojAg8yf9J8SGEncECfgi1HXquuokzH/view?usp=sharing"
-        tmp_bg_path = None
-        try:
-            file_id = letterhead_url.split("/file/d/")[1].split("/")[0]
-            download_url = f"https://drive.google.com/uc?export=download&id={file_id}"
-            bg_response = requests.get(download_url, timeout=10, stream=True)
-            bg_response.raise_for_status()
-            if "image" in bg_response.headers.get("content-type", ""):
-                with tempfile.NamedTemporaryFile(delete=False, suffix=".png") as tmp_bg:
-                    tmp_bg.write(bg_response.content)
-                    tmp_bg.flush()
-                    tmp_bg_path = tmp_bg.name
-                    pdf.image(tmp_bg_path, x=0, y=0, w=210, h=297)
-        except Exception as e:
-            st.warning(f"Background image failed to load: {e}")
-        finally:
-            if tmp_bg_path and os.path.exists(tmp_bg_path):
-                os.unlink(tmp_bg_path)
-
-        # Add Logo
-        logo_url = "https://drive.google.com/file/d/1melsj54pPwsjmYGRE1SQg7EBLZ6BthCn/view?usp=drive_link"
-        tmp_logo_path = None
-        try:
-            file_id = logo_url.split("/file/d/")[1].split("/")[0]
-            download_url = f"https://drive.google.com/uc?export=download&id={file_id}"
-            logo_response = requests.get(download_url, timeout=10, stream=True)
-            logo_response.raise_for_status()
-            if "image" in logo_response.headers.get("content-type", ""):
-                with tempfile.NamedTemporaryFile(delete=False, suffix=".png") as tmp_logo:
-                    tmp_logo.write(logo_response.content)
-                    tmp_logo.flush()
-                    tmp_logo_path = tmp_logo.name
-                    pdf.image(tmp_logo_path, x=150, y=10, w=40)
-        except Exception as e:
-            st.warning(f"Logo failed to load: {e}")
-        finally:
-            if tmp_logo_path and os.path.exists(tmp_logo_path):
-                os.unlink(tmp_logo_path)
-
-        pdf.ln(30)
-
-        pdf.set_font("Arial", style="B", size=18)
-        pdf.cell(0, 15, txt="PAYSLIP", ln=True, align='C', border=1)
-        pdf.ln(5)
-
-        pdf.set_font("Arial", style="", size=12)
-        pdf.cell(0, 10, txt=data["company_name"], ln=True, align='C', border=1)
-        pdf.cell(0, 10, txt=data["company_address"], ln=True, align='C', border=1)
-        pdf.ln(10)
-
-        pdf.cell(95, 10, txt=f"Pay Date: {data['pay_date']}", ln=False, border=1)
-        pdf.cell(95, 10, txt=f"Employee Name: {data['employee_name']}", ln=True, border=1)
-        pdf.cell(95, 10, txt=f"Working Days: {data['working_days']}", ln=False, border=1)
-        pdf.cell(95, 10, txt=f"Employee ID: {data['employee_id']}", ln=True, border=1)
-        pdf.ln(10)
-
-        pdf.set_font("Arial", style="B", size=12)
-        pdf.cell(95, 10, txt="EARNINGS", ln=False, border=1)
-        pdf.cell(90, 10, txt="DEDUCTIONS", ln=True, border=1)
-
-        pdf.set_font("Arial", size=12)
-
-        pdf.cell(95, 10, txt=f"Basic Pay: {format_currency(data['basic_pay'])}", ln=False, border=1)
-        pdf.cell(90, 10, txt=f"Tax: {format_currency(data['tax'])}", ln=True, border=1)
-        pdf.cell(95, 10, txt=f"Housing: {format_currency(data['Housing'])}", ln=False, border=1)
-        pdf.cell(90, 10, txt=f"Pension (Employee): {format_currency(data['employee_pension'])}", ln=True, border=1)
-        pdf.cell(95, 10, txt=f"Transport: {format_currency(data['Transport'])}", ln=False, border=1)
-        pdf.cell(90, 10, txt=f"Other Deductions: {format_currency(data['other_deductions'])}", ln=True, border=1)
-        pdf.cell(95, 10, txt=f"Other Allowances: {format_currency(data['other_allowances'])}", ln=False, border=1)
-        pdf.ln(10)
-
-        pdf.set_font("Arial", style="B", size=12)
-        pdf.cell(95, 10, txt=f"Total Earnings: {format_currency(data['total_earnings'])}", ln=False, border=1)
-        pdf.cell(90, 10, txt=f"Total Deductions: {format_currency(data['total_deductions'])}", ln=True, border=1)
-
-        pdf.ln(5)
-        pdf.set_font("Arial", style="B", size=14)
-        pdf.cell(0, 12, txt=f"Net Pay: {format_currency(data['net_pay'])}", ln=True, border=1, align='C')
-
-        # Return the bytearray directly without encoding
-        pdf_bytes = pdf.output(dest='S')
-        return pdf_bytes
-
     # --- EMAIL UTILS ---
-    def send_email(recipient, subject, body, attachment_bytes, filename):
-        msg = EmailMessage()
-        msg['From'] = SENDER_EMAIL
-        msg['To'] = recipient
-        msg['Subject'] = subject
-        msg.set_content(body)
-        msg.add_attachment(attachment_bytes, maintype='application', subtype='pdf', filename=filename)
-
-        try:
-            with smtplib.SMTP(SMTP_SERVER, SMTP_PORT) as smtp:
-                smtp.starttls()
-                smtp.login(SENDER_EMAIL, SENDER_PASSWORD)
-                smtp.send_message(msg)
-        except Exception as e:
-            st.error(f"Failed to send email to {recipient}: {e}")
+    def payslip_mailer():
+        # A few logged-in sessions are reused for the whole run
+        return Mailer(SMTP_SERVER, SMTP_PORT, SENDER_EMAIL, SENDER_PASSWORD)
 
     # --- PAYSLIP GENERATOR UI ---
     st.markdown("<h2 style='text-align: center;'>📤 Bulk Payslip Generator & Mailer</h2>", unsafe_allow_html=True)
     st.markdown("---")
 
     st.markdown("### 📁 Upload Employee Details (CSV or Excel)")
-    st.markdown("**Required Columns**: employee_name, employee_id, basic_pay, Housing, Transport, other_allowances, tax, employee_pension, other_deductions, total_earnings, total_deductions, net_pay, email")
+    st.markdown(f"**Required Columns**: {', '.join(REQUIRED_COLUMNS)}")
 
     uploaded_file = st.file_uploader("Upload File", type=["csv", "xlsx"], label_visibility="collapsed")
 
@@ -178,83 +64,86 @@ with tab1:
     if uploaded_file:
         df = load_data(uploaded_file)
         if df is not None:
-            # Check for required columns
-            required_columns = [
-                'employee_name', 'employee_id', 'basic_pay', 'Housing', 'Transport',
-                'other_allowances', 'tax', 'employee_pension', 'other_deductions',
-                'total_earnings', 'total_deductions', 'net_pay', 'email'
-            ]
-            missing_columns = [col for col in required_columns if col not in df.columns]
-            if missing_columns:
-                st.error(f"Missing required columns: {', '.join(missing_columns)}")
+            missing = missing_columns(df)
+            if missing:
+                st.error(f"Missing required columns: {', '.join(missing)}")
             else:
-                st.success(f"✅ {len(df)} employees loaded successfully!")
+                payroll, report = ingest_payroll(df)
+                st.success(f"✅ {len(payroll)} employees loaded successfully!")
                 st.markdown("### 👀 Preview of Uploaded Data")
                 st.dataframe(df, use_container_width=True)
 
+                # Bad rows are held back before anything is rendered or emailed
+                if not report.empty:
+                    st.warning(f"⚠️ {len(report)} row(s) failed validation and will be skipped.")
+                    st.dataframe(report, use_container_width=True, hide_index=True)
+                    if not st.checkbox("Include flagged rows anyway", value=False):
+                        payroll = payroll[payroll['issues'] == ""]
+
                 generate_col, email_col = st.columns(2)
 
+                records = payslip_records(payroll, company_name, company_address, pay_date, working_days)
+
                 with generate_col:
+                    merged = st.checkbox("Also build one merged PDF", value=False)
                     if st.button("📥 Generate Payslips", use_container_width=True):
-                        for idx, row in df.iterrows():
-                            data = {
-                                "company_name": company_name,
-                                "company_address": company_address,
-                                "pay_date": pay_date.strftime("%Y-%m-%d"),
-                                "working_days": working_days,
-                                "employee_name": row['employee_name'],
-                                "employee_id": row['employee_id'],
-                                "basic_pay": safe_float(row['basic_pay']),
-                                "Housing": safe_float(row['Housing']),
-                                "Transport": safe_float(row['Transport']),
-                                "other_allowances": safe_float(row['other_allowances']),
-                                "tax": safe_float(row['tax']),
-                                "employee_pension": safe_float(row['employee_pension']),
-                                "other_deductions": safe_float(row['other_deductions']),
-                                "total_earnings": safe_float(row['total_earnings']),
-                                "total_deductions": safe_float(row['total_deductions']),
-                                "net_pay": safe_float(row['net_pay'])
-                            }
-                            try:
-                                pdf_bytes = generate_pdf(data)
-                                filename = f"{row['employee_name'].replace(' ', '_')}_payslip.pdf"
-                                b64 = base64.b64encode(pdf_bytes).decode()
-                                href = f'<a href="data:application/pdf;base64,{b64}" download="{filename}">Download {filename}</a>'
-                                st.markdown(href, unsafe_allow_html=True)
-                            except Exception as e:
-                                st.error(f"Failed to generate payslip for {row['employee_name']}: {e}")
+                        progress = st.progress(0, text="Rendering payslips…")
+                        zip_file, merged_file, errors = build_payslip_bundle(
+                            records, merged=merged,
+                            on_progress=lambda done, total: progress.progress(
+                                done / total, text=f"Rendered {done} of {total} payslips"))
+                        # Kept in the session so the download reruns don't lose them
+                        st.session_state["payslip_bundle"] = {
+                            "zip": zip_file,
+                            "merged": merged_file,
+                            "errors": errors,
+                            "pay_date": pay_date.strftime("%Y-%m-%d"),
+                        }
+
+                    bundle = st.session_state.get("payslip_bundle")
+                    if bundle:
+                        for error in bundle["errors"]:
+                            st.error(f"Failed to generate payslip for {error['employee_name']}: {error['error']}")
+                        # Read from the spooled files only when a button is clicked
+                        st.download_button("⬇️ Download Payslips (ZIP)",
+                                           data=lambda: bundle_bytes(bundle["zip"]),
+                                           file_name=f"payslips_{bundle['pay_date']}.zip",
+                                           mime="application/zip", use_container_width=True)
+                        if bundle["merged"] is not None:
+                            st.download_button("⬇️ Download Merged PDF",
+                                               data=lambda: bundle_bytes(bundle["merged"]),
+                                               file_name=f"payslips_{bundle['pay_date']}.pdf",
+                                               mime="application/pdf", use_container_width=True)
 
                 with email_col:
                     if st.button("📧 Email Payslips", use_container_width=True):
                         with st.spinner("⏳ Sending Payslips..."):
-                            progress = st.progress(0)
-                            for idx, row in df.iterrows():
-                                data = {
-                                    "company_name": company_name,
-                                    "company_address": company_address,
-                                    "pay_date": pay_date.strftime("%Y-%m-%d"),
-                                    "working_days": working_days,
-                                    "employee_name": row['employee_name'],
-                                    "employee_id": row['employee_id'],
-                                    "basic_pay": safe_float(row['basic_pay']),
-                                    "Housing": safe_float(row['Housing']),
-                                    "Transport": safe_float(row['Transport']),
-                                    "other_allowances": safe_float(row['other_allowances']),
-                                    "tax": safe_float(row['tax']),
-                                    "employee_pension": safe_float(row['employee_pension']),
-                                    "other_deductions": safe_float(row['other_deductions']),
-                                    "total_earnings": safe_float(row['total_earnings']),
-                                    "total_deductions": safe_float(row['total_deductions']),
-                                    "net_pay": safe_float(row['net_pay'])
-                                }
-                                try:
-                                    pdf_bytes = generate_pdf(data)
-                                    filename = f"{row['employee_name'].replace(' ', '_')}_payslip.pdf"
-                                    send_email(row['email'], "Your Monthly Payslip", "Please find attached your payslip.", pdf_bytes, filename)
-                                except Exception as e:
-                                    st.error(f"Failed to process payslip for {row['employee_name']}: {e}")
-                                progress.progress((idx + 1) / len(df))
-                            st.success("🎉 All Payslips Processed Successfully!")
+                            progress = st.progress(0, text="Rendering payslips…")
+                            failed = 0
+                            with payslip_mailer() as mailer:
+                                sends = []
+                                for result in render_payslips(records):
+                                    if result["error"]:
+                                        failed += 1
+                                        st.error(f"Failed to process payslip for {result['employee_name']}: {result['error']}")
+                                    else:
+                                        msg = build_message(SENDER_EMAIL, result["email"], "Your Monthly Payslip",
+                                                            "Please find attached your payslip.", result["pdf"], result["filename"])
+                                        sends.append(mailer.submit(result["employee_name"], msg))
+                                    progress.progress(0.5 * (len(sends) + failed) / len(records),
+                                                      text="Rendering and queueing payslips…")
+                                for sent, delivery in enumerate(mailer.results(sends), start=1):
+                                    if delivery["status"] == FAILED:
+                                        failed += 1
+                                        kind = "temporary" if delivery["retryable"] else "permanent"
+                                        st.error(f"Failed to send email to {delivery['to']} ({kind} error after "
+                                                 f"{delivery['attempts']} attempt(s)): {delivery['error']}")
+                                    progress.progress(0.5 + 0.5 * sent / max(len(sends), 1),
+                                                      text=f"Sent {sent} of {len(sends)} emails")
+                            if failed:
+                                st.warning(f"⚠️ {len(records) - failed} of {len(records)} payslips sent; {failed} failed.")
+                            else:
+                                st.success("🎉 All Payslips Processed Successfully!")
 
 # --- TAB 2: EMPLOYEE RECORDS (PLACEHOLDER) ---
 with tab2:
@@ -2,23 +2,16 @@
 import streamlit as st
 import pandas as pd
 from datetime import date
-from st_aggrid import AgGrid, GridOptionsBuilder, GridUpdateMode
-from utils.auth import get_gspread_client
+from utils.grid import paged_grid
+from utils.sheets import invalidate_tab, load_tab, render_quarantine
+from utils.writeback import save_grid_edits
+from utils.write_queue import queue_row
 
 def render_at_a_glance():
     SHEET_KEY = "1PqngUtZTmt0c_CV8uq--3HHMx40SvBE3yB-FICcLpiA"
     TAB_NAME = "at_a_glance"
 
-    @st.cache_data(ttl=60)
-    def load_data():
-        client = get_gspread_client()
-        sheet = client.open_by_key(SHEET_KEY)
-        ws = sheet.worksheet(TAB_NAME)
-        df = pd.DataFrame(ws.get_all_records())
-        return df, ws
-
-    df, worksheet = load_data()
-    df.columns = [str(col).strip().title() for col in df.columns]  # safer handling
+    df = load_tab(SHEET_KEY, TAB_NAME)
 
     st.subheader("📌 At a Glance Summary")
 
@@ -44,35 +37,24 @@ def render_at_a_glance():
             "Inflow": round(inflow, 2),
             "Outflow": round(outflow, 2)
         }
-        safe_row = [[str(v) if pd.isna(v) else v for v in new_row.values()]]
-        worksheet.append_rows(safe_row)
-        st.success("✅ Summary recorded successfully!")
-        st.rerun()
+        safe_row = [str(v) if pd.isna(v) else v for v in new_row.values()]
+        queue_row(SHEET_KEY, TAB_NAME, safe_row)
+        st.success("✅ Summary queued for saving.")
+
+    render_quarantine(SHEET_KEY, TAB_NAME)
 
     st.markdown("### 📋 Daily Balances Table")
     col_refresh, _ = st.columns([1, 9])
     with col_refresh:
         if st.button("🔄 Refresh Data", key="glance_refresh_btn"):
-            st.cache_data.clear()
+            invalidate_tab(SHEET_KEY, TAB_NAME)
             st.rerun()
 
     if not df.empty:
-        df["Date"] = pd.to_datetime(df["Date"], errors="coerce")
-        df = df[df["Date"].notna()]
-        gb = GridOptionsBuilder.from_dataframe(df)
-        gb.configure_pagination()
-        gb.configure_default_column(editable=True, filter=True, resizable=True)
-        grid_response = AgGrid(
-            df,
-            gridOptions=gb.build(),
-            update_mode=GridUpdateMode.VALUE_CHANGED,
-            fit_columns_on_grid_load=True,
-            height=350
-        )
+        page, grid_response = paged_grid(df, key="at_a_glance", height=350)
 
         updated_df = grid_response["data"]
-        if not updated_df.equals(df):
-            worksheet.update([updated_df.columns.values.tolist()] + updated_df.values.tolist())
+        if save_grid_edits(SHEET_KEY, TAB_NAME, page, updated_df):
             st.success("✅ Table updates saved!")
     else:
         st.info("ℹ️ No data available in At a Glance sheet.")
@@ -1,35 +1,18 @@
 import streamlit as st
 import pandas as pd
 from datetime import date
-from st_aggrid import AgGrid, GridOptionsBuilder, GridUpdateMode
-from utils.auth import get_gspread_client
+from utils.grid import paged_grid
+from utils.reference_data import get_bank_details
+from utils.sheets import invalidate_tab, load_tab, render_quarantine
+from utils.writeback import save_grid_edits
+from utils.write_queue import queue_row
 
 def render_expenses():
     EXPENSE_SHEET_KEY = "1PqngUtZTmt0c_CV8uq--3HHMx40SvBE3yB-FICcLpiA"
     EXPENSE_TAB = "expenses"
-    BANK_SHEET_KEY = "1RJPEK_ye59vA8ngWiTUYkJZ-xOc815TyKsQ3-f6u4kk"
-    BANK_TAB = "List of A/C"
 
-    @st.cache_data(ttl=60)
-    def load_expenses():
-        client = get_gspread_client()
-        sheet = client.open_by_key(EXPENSE_SHEET_KEY)
-        ws = sheet.worksheet(EXPENSE_TAB)
-        df = pd.DataFrame(ws.get_all_records())
-        return df, ws
-
-    @st.cache_data(ttl=60)
-    def load_bank_details():
-        client = get_gspread_client()
-        sheet = client.open_by_key(BANK_SHEET_KEY)
-        df = pd.DataFrame(sheet.worksheet(BANK_TAB).get_all_records())
-        if "Bank Details" in df.columns:
-            return df["Bank Details"].dropna().unique().tolist()
-        return []
-
-    df, worksheet = load_expenses()
-    df.columns = [str(col).strip().title() for col in df.columns]
-    bank_options = load_bank_details()
+    df = load_tab(EXPENSE_SHEET_KEY, EXPENSE_TAB)
+    bank_options = get_bank_details()
 
     st.subheader("💸 Expenses Entry")
 
@@ -52,35 +35,24 @@ def render_expenses():
             "Amount USD": round(amount_usd, 2),
             "Bank": bank
         }
-        safe_row = [[str(v) if pd.isna(v) else v for v in new_row.values()]]
-        worksheet.append_rows(safe_row)
-        st.success("✅ Expense recorded successfully!")
-        st.rerun()
+        safe_row = [str(v) if pd.isna(v) else v for v in new_row.values()]
+        queue_row(EXPENSE_SHEET_KEY, EXPENSE_TAB, safe_row)
+        st.success("✅ Expense queued for saving.")
+
+    render_quarantine(EXPENSE_SHEET_KEY, EXPENSE_TAB)
 
     st.markdown("### 📋 Expenses Table")
     col_refresh, _ = st.columns([1, 9])
     with col_refresh:
         if st.button("🔄 Refresh Data", key="expense_refresh_btn"):
-            st.cache_data.clear()
+            invalidate_tab(EXPENSE_SHEET_KEY, EXPENSE_TAB)
             st.rerun()
 
     if not df.empty:
-        df["Date"] = pd.to_datetime(df["Date"], errors="coerce")
-        df = df[df["Date"].notna()]
-        gb = GridOptionsBuilder.from_dataframe(df)
-        gb.configure_pagination()
-        gb.configure_default_column(editable=True, filter=True, resizable=True)
-        grid_response = AgGrid(
-            df,
-            gridOptions=gb.build(),
-            update_mode=GridUpdateMode.VALUE_CHANGED,
-            fit_columns_on_grid_load=True,
-            height=350
-        )
+        page, grid_response = paged_grid(df, key="expenses", height=350)
 
         updated_df = grid_response["data"]
-        if not updated_df.equals(df):
-            worksheet.update([updated_df.columns.values.tolist()] + updated_df.values.tolist())
+        if save_grid_edits(EXPENSE_SHEET_KEY, EXPENSE_TAB, page, updated_df):
             st.success("✅ Table updates saved!")
     else:
         st.info("ℹ️ No data available in Expenses sheet.")
@@ -2,45 +2,22 @@ import streamlit as st
 import pandas as pd
 from datetime import date
 from calendar import month_name
-from st_aggrid import AgGrid, GridOptionsBuilder, GridUpdateMode
-from utils.auth import get_gspread_client
+from utils.grid import paged_grid
+from utils.reference_data import get_clients, get_sellers, get_transaction_types
+from utils.rollups import for_display, get_rollup, rollup
+from utils.sheets import invalidate_tab, load_tab, render_quarantine
+from utils.writeback import save_grid_edits
+from utils.write_queue import queue_row
 
 def render_usdngn():
     SHEET_KEY = "1PqngUtZTmt0c_CV8uq--3HHMx40SvBE3yB-FICcLpiA"
     TAB_NAME = "usdngn"
-    DATABASE_KEY = "1j_D2QiaS3IEJuNI27OA56l8nWWatzxidLKuqV4Dfet4"
-    SELLER_TAB = "Seller List"
-    CLIENT_TAB = "Client List"
-    TXN_TYPE_TAB = "Transaction type"
-
-    @st.cache_data(ttl=3600)
-    def get_dropdown_list(tab):
-        client = get_gspread_client()
-        sheet = client.open_by_key(DATABASE_KEY)
-        try:
-            ws = sheet.worksheet(tab)
-            df = pd.DataFrame(ws.get_all_values())
-            if not df.empty:
-                return df.iloc[1:, 0].dropna().tolist()
-            return []
-        except Exception as e:
-            st.warning(f"Tab '{tab}' not found in the database sheet. Please check spelling/casing.")
-            return []
-
-    seller_list = get_dropdown_list(SELLER_TAB)
-    client_list = get_dropdown_list(CLIENT_TAB)
-    txn_type_list = get_dropdown_list(TXN_TYPE_TAB)
-
-    @st.cache_data(ttl=60)
-    def load_data():
-        client = get_gspread_client()
-        sheet = client.open_by_key(SHEET_KEY)
-        ws = sheet.worksheet(TAB_NAME)
-        df = pd.DataFrame(ws.get_all_records())
-        return df, ws
-
-    df, worksheet = load_data()
-    df.columns = [str(col).strip() for col in df.columns]
+
+    seller_list = get_sellers()
+    client_list = get_clients()
+    txn_type_list = get_transaction_types()
+
+    df = load_tab(SHEET_KEY, TAB_NAME)
 
     st.subheader("💱 USD/NGN Tracker")
 
@@ -122,33 +99,24 @@ def render_usdngn():
             "Customer Obli Status": customer_obli_status,
             "Status": status,
         }
-        worksheet.append_row([sanitize(v) for v in new_row.values()])
-        st.success("✅ USD/NGN transaction added successfully!")
-        st.rerun()
+        queue_row(SHEET_KEY, TAB_NAME, [sanitize(v) for v in new_row.values()])
+        st.success("✅ USD/NGN transaction queued for saving.")
+
+    render_quarantine(SHEET_KEY, TAB_NAME)
 
     # --- Display Table ---
     st.markdown("### 📋 USD/NGN Transactions Table")
     col_refresh, _ = st.columns([1, 9])
     with col_refresh:
         if st.button("🔄 Refresh Data", key="usdngn_refresh_btn"):
-            st.cache_data.clear()
+            invalidate_tab(SHEET_KEY, TAB_NAME)
             st.rerun()
 
     if not df.empty:
-        gb = GridOptionsBuilder.from_dataframe(df)
-        gb.configure_pagination()
-        gb.configure_default_column(editable=True, filter=True, resizable=True)
-        grid_response = AgGrid(
-            df,
-            gridOptions=gb.build(),
-            update_mode=GridUpdateMode.VALUE_CHANGED,
-            fit_columns_on_grid_load=True,
-            height=400
-        )
+        page, grid_response = paged_grid(df, key="usdngn", height=400)
 
         updated_df = grid_response["data"]
-        if not updated_df.equals(df):
-            worksheet.update([updated_df.columns.values.tolist()] + updated_df.values.tolist())
+        if save_grid_edits(SHEET_KEY, TAB_NAME, page, updated_df):
             st.success("✅ Table updates saved!")
     else:
         st.info("ℹ️ No data available in USD/NGN sheet.")
@@ -157,8 +125,6 @@ def render_usdngn():
     st.markdown("## 📅 Filter Summaries by Date Range")
 
     if not df.empty and "Date" in df.columns:
-        df["Date"] = pd.to_datetime(df["Date"], errors="coerce")
-        df = df[df["Date"].notna()]
 
         min_date = df["Date"].min().date()
         max_date = df["Date"].max().date()
@@ -196,30 +162,14 @@ def render_usdngn():
         filtered_df = pd.DataFrame()
 
     if not filtered_df.empty:
-        # Only sales
-        sales_df = filtered_df[filtered_df["Transaction Type"].str.lower() == "sales"].copy()
-
-        for col in ["Profit (Ngn)", "Lcy Value", "Fcy Total Value"]:
-            sales_df[col] = pd.to_numeric(sales_df[col], errors="coerce").fillna(0)
-
-        if not sales_df.empty:
-            # Daily
-            daily_summary = sales_df.groupby("Date")[["Profit (Ngn)", "Lcy Value", "Fcy Total Value"]].sum().reset_index()
-            st.markdown("### 📈 Daily Summary (Sales Only)")
-            st.dataframe(daily_summary, hide_index=True)
-
-            # Weekly
-            sales_df["Year"] = sales_df["Date"].dt.year
-            sales_df["Week"] = sales_df["Date"].dt.isocalendar().week
-            weekly_summary = sales_df.groupby(["Year", "Week"])[["Profit (Ngn)", "Lcy Value", "Fcy Total Value"]].sum().reset_index()
-            st.markdown("### 📈 Weekly Summary (Sales Only)")
-            st.dataframe(weekly_summary, hide_index=True)
-
-            # Monthly
-            sales_df["MonthStr"] = sales_df["Date"].dt.strftime('%Y-%m')
-            monthly_summary = sales_df.groupby("MonthStr")[["Profit (Ngn)", "Lcy Value", "Fcy Total Value"]].sum().reset_index()
-            st.markdown("### 📈 Monthly Summary (Sales Only)")
-            st.dataframe(monthly_summary, hide_index=True)
+        # Sales-only totals are kept materialised per period
+        daily = get_rollup(SHEET_KEY, TAB_NAME, "Daily", start_date, end_date)
+
+        if not daily.empty:
+            for period, label in [("Daily", "Date"), ("Weekly", "Week"), ("Monthly", "Month")]:
+                st.markdown(f"### 📈 {period} Summary (Sales Only)")
+                rolled = rollup(period=period, daily=daily)
+                st.dataframe(for_display(rolled, label), hide_index=True)
         else:
             st.info("No sales data found in the selected date range.")
     else:
@@ -1,8 +1,9 @@
 import streamlit as st
 import pandas as pd
 import time
-from st_aggrid import AgGrid, GridOptionsBuilder, GridUpdateMode
-from utils.auth import get_gspread_client
+from utils.grid import paged_grid
+from utils.sheets import get_worksheet, invalidate_tab, load_tab, record_append, with_row_id
+from utils.writeback import save_grid_edits
 
 # --- CONFIG ---
 SHEET_KEY = "1j_D2QiaS3IEJuNI27OA56l8nWWatzxidLKuqV4Dfet4"
@@ -11,17 +12,10 @@ TAB_NAME = "Client List"
 def render_client_list():
     st.markdown("<div style='background-color:#D6EAF8;padding:10px;border-radius:5px'><h4>➕ Add Client</h4></div>", unsafe_allow_html=True)
 
-    client = get_gspread_client()
-    sheet = client.open_by_key(SHEET_KEY)
-    worksheet = sheet.worksheet(TAB_NAME)
+    worksheet = get_worksheet(SHEET_KEY, TAB_NAME)
 
     # --- Load data from Google Sheet ---
-    @st.cache_data(ttl=60)
-    def load_data():
-        records = worksheet.get_all_records()
-        return pd.DataFrame(records)
-
-    df = load_data()
+    df = load_tab(SHEET_KEY, TAB_NAME)
 
     # --- Add Client Form ---
     with st.form("add_form_client_list", clear_on_submit=False):
@@ -31,9 +25,11 @@ def render_client_list():
             if inputs[0].strip().lower() in df["Client Name"].str.lower().str.strip().values:
                 st.error(f"Client '{inputs[0]}' already exists.")
             else:
-                new_row = pd.DataFrame([inputs], columns=["Client Name", "Email", "Phone Number"])
-                df = pd.concat([df, new_row], ignore_index=True)
-                worksheet.update([df.columns.values.tolist()] + df.values.tolist())
+                values = dict(zip(["Client Name", "Email", "Phone Number"], inputs))
+                new_row = with_row_id(SHEET_KEY, TAB_NAME, [values.get(col, "") for col in df.columns])
+                response = worksheet.append_row(new_row)
+                # Bumps the tab version so every dropdown picks it up at once
+                record_append(SHEET_KEY, TAB_NAME, [new_row], response)
                 st.success("Client added.")
                 st.rerun()
 
@@ -41,30 +37,18 @@ def render_client_list():
     st.markdown("### 📋 Client Table")
 
     if st.button("🔄 Refresh Client List"):
-        st.cache_data.clear()
+        invalidate_tab(SHEET_KEY, TAB_NAME)
         st.rerun()
 
     # --- AgGrid Table Display ---
-    gb = GridOptionsBuilder.from_dataframe(df)
-    gb.configure_pagination()
-    gb.configure_default_column(editable=True)
-
-    grid_response = AgGrid(
-        df,
-        gridOptions=gb.build(),
-        update_mode=GridUpdateMode.VALUE_CHANGED,
-        fit_columns_on_grid_load=True,
-        height=400,
-        reload_data=False
-    )
+    page, grid_response = paged_grid(df, key="client_list", height=400)
 
     updated_df = grid_response["data"]
 
     # --- Save edits from AgGrid ---
-    if not updated_df.equals(df):
-        st.success("Changes detected. Saving...")
+    if save_grid_edits(SHEET_KEY, TAB_NAME, page, updated_df):
+        st.success("Changes saved.")
         time.sleep(0.5)
-        worksheet.update([updated_df.columns.values.tolist()] + updated_df.values.tolist())
         st.rerun()
 
 
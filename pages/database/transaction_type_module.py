@@ -1,8 +1,9 @@
 import streamlit as st
 import pandas as pd
 import time
-from st_aggrid import AgGrid, GridOptionsBuilder, GridUpdateMode
-from utils.auth import get_gspread_client
+from utils.grid import paged_grid
+from utils.sheets import get_worksheet, invalidate_tab, load_tab, record_append, with_row_id
+from utils.writeback import save_grid_edits
 
 # --- CONFIG ---
 SHEET_KEY = "1j_D2QiaS3IEJuNI27OA56l8nWWatzxidLKuqV4Dfet4"
@@ -11,17 +12,10 @@ TAB_NAME = "Transaction type"
 def render_transaction_type():
     st.markdown("<div style='background-color:#EAEDED;padding:10px;border-radius:5px'><h4>➕ Add Transaction Type</h4></div>", unsafe_allow_html=True)
 
-    client = get_gspread_client()
-    sheet = client.open_by_key(SHEET_KEY)
-    worksheet = sheet.worksheet(TAB_NAME)
+    worksheet = get_worksheet(SHEET_KEY, TAB_NAME)
 
     # --- Load data from Google Sheet ---
-    @st.cache_data(ttl=60)
-    def load_data():
-        records = worksheet.get_all_records()
-        return pd.DataFrame(records)
-
-    df = load_data()
+    df = load_tab(SHEET_KEY, TAB_NAME)
 
     # --- Add Transaction Type Form ---
     with st.form("add_form_transaction_type", clear_on_submit=False):
@@ -31,9 +25,11 @@ def render_transaction_type():
             if inputs[0].strip().lower() in df["Transaction Type"].str.lower().str.strip().values:
                 st.error(f"Transaction Type '{inputs[0]}' already exists.")
             else:
-                new_row = pd.DataFrame([inputs], columns=["Transaction Type", "Category"])
-                df = pd.concat([df, new_row], ignore_index=True)
-                worksheet.update([df.columns.values.tolist()] + df.values.tolist())
+                values = dict(zip(["Transaction Type", "Category"], inputs))
+                new_row = with_row_id(SHEET_KEY, TAB_NAME, [values.get(col, "") for col in df.columns])
+                response = worksheet.append_row(new_row)
+                # Bumps the tab version so every dropdown picks it up at once
+                record_append(SHEET_KEY, TAB_NAME, [new_row], response)
                 st.success("Transaction Type added.")
                 st.rerun()
 
@@ -41,28 +37,16 @@ def render_transaction_type():
     st.markdown("### 📋 Transaction Type Table")
 
     if st.button("🔄 Refresh Transaction Types"):
-        st.cache_data.clear()
+        invalidate_tab(SHEET_KEY, TAB_NAME)
         st.rerun()
 
     # --- AgGrid Table Display ---
-    gb = GridOptionsBuilder.from_dataframe(df)
-    gb.configure_pagination()
-    gb.configure_default_column(editable=True)
-
-    grid_response = AgGrid(
-        df,
-        gridOptions=gb.build(),
-        update_mode=GridUpdateMode.VALUE_CHANGED,
-        fit_columns_on_grid_load=True,
-        height=400,
-        reload_data=False
-    )
+    page, grid_response = paged_grid(df, key="transaction_types", height=400)
 
     updated_df = grid_response["data"]
 
     # --- Save edits from AgGrid ---
-    if not updated_df.equals(df):
-        st.success("Changes detected. Saving...")
+    if save_grid_edits(SHEET_KEY, TAB_NAME, page, updated_df):
+        st.success("Changes saved.")
         time.sleep(0.5)
-        worksheet.update([updated_df.columns.values.tolist()] + updated_df.values.tolist())
         st.rerun()
@@ -0,0 +1,171 @@
+# Pooled SMTP delivery for payslip emails
+import logging
+import random
+import smtplib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from email.message import EmailMessage
+
+POOL_SIZE = 3
+# Messages per second across the whole pool
+RATE_LIMIT = 5.0
+MAX_ATTEMPTS = 4
+BACKOFF_BASE = 1.0
+SMTP_TIMEOUT = 30
+
+SENT = "sent"
+FAILED = "failed"
+
+log = logging.getLogger(__name__)
+
+
+def build_message(sender, recipient, subject, body, attachment_bytes, filename):
+    msg = EmailMessage()
+    msg['From'] = sender
+    msg['To'] = recipient
+    msg['Subject'] = subject
+    msg.set_content(body)
+    msg.add_attachment(bytes(attachment_bytes), maintype='application', subtype='pdf', filename=filename)
+    return msg
+
+
+def is_retryable(exc):
+    """Temporary failures (4xx replies, dropped or refused connections) are worth retrying."""
+    if isinstance(exc, smtplib.SMTPServerDisconnected):
+        return True
+    if isinstance(exc, smtplib.SMTPRecipientsRefused):
+        return all(400 <= code < 500 for code, _ in exc.recipients.values())
+    if isinstance(exc, smtplib.SMTPResponseException):
+        return 400 <= exc.smtp_code < 500
+    if isinstance(exc, smtplib.SMTPException):
+        return False
+    # Timeouts, resets and refused connections
+    return isinstance(exc, OSError)
+
+
+class _RateLimiter:
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0.0
+        self.next_at = 0.0
+        self.lock = threading.Lock()
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            start = max(now, self.next_at)
+            self.next_at = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+
+class Mailer:
+    """A few authenticated SMTP sessions shared by many messages.
+
+    Each worker thread opens its session on first use and keeps it for the
+    whole run, reconnecting only when the server drops it. Point ``host`` /
+    ``port`` at a local stand-in (e.g. ``python -m aiosmtpd -n``) with
+    ``starttls=False`` and no credentials to exercise it without a real server.
+    """
+
+    def __init__(self, host, port, username=None, password=None, starttls=True,
+                 pool_size=POOL_SIZE, rate_limit=RATE_LIMIT, max_attempts=MAX_ATTEMPTS):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.max_attempts = max_attempts
+        self._limiter = _RateLimiter(rate_limit)
+        self._local = threading.local()
+        self._sessions = []
+        self._sessions_lock = threading.Lock()
+        # Set when connecting fails permanently (e.g. bad credentials)
+        self._fatal = None
+        self._executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="smtp")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # --- SESSIONS ---
+    def _connect(self):
+        if self._fatal is not None:
+            raise self._fatal
+        smtp = smtplib.SMTP(self.host, self.port, timeout=SMTP_TIMEOUT)
+        try:
+            if self.starttls:
+                smtp.starttls()
+            if self.username:
+                smtp.login(self.username, self.password)
+        except Exception as exc:
+            smtp.close()
+            if not is_retryable(exc):
+                # Every other message would fail the same way; stop logging in
+                self._fatal = exc
+            raise
+        with self._sessions_lock:
+            self._sessions.append(smtp)
+        return smtp
+
+    def _session(self):
+        smtp = getattr(self._local, "smtp", None)
+        if smtp is None:
+            smtp = self._local.smtp = self._connect()
+        return smtp
+
+    def _drop_session(self):
+        smtp = getattr(self._local, "smtp", None)
+        self._local.smtp = None
+        if smtp is not None:
+            with self._sessions_lock:
+                if smtp in self._sessions:
+                    self._sessions.remove(smtp)
+            try:
+                smtp.close()
+            except Exception:
+                pass
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        with self._sessions_lock:
+            sessions, self._sessions = self._sessions, []
+        for smtp in sessions:
+            try:
+                smtp.quit()
+            except Exception:
+                smtp.close()
+
+    # --- DELIVERY ---
+    def _deliver(self, key, msg):
+        attempts = 0
+        while True:
+            attempts += 1
+            self._limiter.wait()
+            try:
+                self._session().send_message(msg)
+                return {"key": key, "to": msg['To'], "status": SENT, "attempts": attempts,
+                        "error": None, "retryable": False}
+            except Exception as exc:
+                retryable = is_retryable(exc)
+                # A session that errored mid-transaction is not safe to reuse
+                if retryable:
+                    self._drop_session()
+                if not retryable or attempts >= self.max_attempts:
+                    log.warning("Giving up on email to %s after %d attempt(s)", msg['To'], attempts,
+                                exc_info=True)
+                    return {"key": key, "to": msg['To'], "status": FAILED, "attempts": attempts,
+                            "error": str(exc), "retryable": retryable}
+                time.sleep(BACKOFF_BASE * 2 ** (attempts - 1) + random.uniform(0, 0.5))
+
+    def submit(self, key, msg):
+        """Queue one message; the future resolves to its delivery result dict."""
+        return self._executor.submit(self._deliver, key, msg)
+
+    @staticmethod
+    def results(futures):
+        """Yield delivery results as they complete."""
+        for future in as_completed(futures):
+            yield future.result()
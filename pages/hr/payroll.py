@@ -0,0 +1,67 @@
+# Payroll upload ingestion: whole-frame coercion and consistency checks
+import pandas as pd
+
+EARNINGS_COLUMNS = ['basic_pay', 'Housing', 'Transport', 'other_allowances']
+DEDUCTION_COLUMNS = ['tax', 'employee_pension', 'other_deductions']
+TOTAL_COLUMNS = ['total_earnings', 'total_deductions', 'net_pay']
+MONEY_COLUMNS = EARNINGS_COLUMNS + DEDUCTION_COLUMNS + TOTAL_COLUMNS
+
+REQUIRED_COLUMNS = ['employee_name', 'employee_id'] + MONEY_COLUMNS + ['email']
+
+# Totals may differ from their components by rounding, but no more
+TOLERANCE = 0.01
+
+
+def missing_columns(df):
+    return [col for col in REQUIRED_COLUMNS if col not in df.columns]
+
+
+def _blank(series):
+    return series.isna() | (series.astype(str).str.strip() == "")
+
+
+def ingest_payroll(df):
+    """Coerce an uploaded payroll frame and check it, all column-wise.
+
+    Returns ``(payroll, report)``. ``payroll`` has float money columns
+    (blank cells count as 0) plus ``computed_*`` totals and an ``issues``
+    column; ``report`` lists every flagged row with its file row number.
+    """
+    payroll = df.reset_index(drop=True)
+    issues = pd.Series("", index=payroll.index)
+
+    for col in MONEY_COLUMNS:
+        raw = payroll[col]
+        if pd.api.types.is_numeric_dtype(raw):
+            values = raw
+        else:
+            # Text columns: thousands separators and stray spaces are fine
+            blank = _blank(raw)
+            text = raw.astype(str).str.replace(",", "", regex=False).str.strip()
+            values = pd.to_numeric(text.where(~blank), errors="coerce")
+            issues[values.isna() & ~blank] += f"{col} is not a number; "
+        payroll[col] = values.fillna(0.0).astype("float64")
+
+    payroll['computed_earnings'] = payroll[EARNINGS_COLUMNS].sum(axis=1)
+    payroll['computed_deductions'] = payroll[DEDUCTION_COLUMNS].sum(axis=1)
+    payroll['computed_net_pay'] = payroll['computed_earnings'] - payroll['computed_deductions']
+    for total, computed in [('total_earnings', 'computed_earnings'),
+                            ('total_deductions', 'computed_deductions'),
+                            ('net_pay', 'computed_net_pay')]:
+        off = (payroll[total] - payroll[computed]).abs() > TOLERANCE
+        if off.any():
+            issues[off] += (f"{total} " + payroll.loc[off, total].map("{:,.2f}".format)
+                            + " ≠ " + payroll.loc[off, computed].map("{:,.2f}".format) + "; ")
+
+    issues[_blank(payroll['employee_name'])] += "employee_name is blank; "
+    issues[~payroll['email'].astype(str).str.fullmatch(r"[^@\s]+@[^@\s]+\.[^@\s]+")] += "email is invalid; "
+    ids = payroll['employee_id'].astype(str).str.strip()
+    issues[_blank(payroll['employee_id'])] += "employee_id is blank; "
+    issues[ids.duplicated(keep=False) & ~_blank(payroll['employee_id'])] += "employee_id is duplicated; "
+
+    payroll['issues'] = issues.str.rstrip("; ")
+    flagged = payroll['issues'] != ""
+    report = payroll.loc[flagged, ['employee_name', 'employee_id', 'issues']].copy()
+    # Header is row 1 of the uploaded file
+    report.insert(0, 'row', report.index + 2)
+    return payroll, report.reset_index(drop=True)
@@ -0,0 +1,95 @@
+# Payslip letterhead and logo, fetched once and shared by every payslip
+import logging
+import os
+import threading
+import time
+from io import BytesIO
+import requests
+from PIL import Image
+
+# name -> (Google Drive file id, bundled copy under assets/)
+ASSETS = {
+    "letterhead": ("1vTojAg8yf9J8SGEncECfgi1HXquuokzH", os.path.join("assets", "salmnine_letterhead.png")),
+    "logo": ("1melsj54pPwsjmYGRE1SQg7EBLZ6BthCn", os.path.join("assets", "salmnine_logo.png")),
+}
+CACHE_DIR = os.path.join("data", "asset_cache")
+# Downloaded copies are re-fetched from Drive after this long
+CACHE_MAX_AGE = 7 * 24 * 3600
+DOWNLOAD_TIMEOUT = 10
+# After a failed load, payslips go out without the image for this long
+RETRY_AFTER = 5 * 60
+
+log = logging.getLogger(__name__)
+_images = {}   # name -> (loaded_at, decoded PIL image or None when unavailable)
+_lock = threading.Lock()
+
+
+def _decode(data):
+    # verify() rejects truncated or non-image downloads (e.g. Drive HTML pages)
+    Image.open(BytesIO(data)).verify()
+    image = Image.open(BytesIO(data))
+    image.load()
+    return image
+
+
+def _download(file_id):
+    response = requests.get(f"https://drive.google.com/uc?export=download&id={file_id}",
+                            timeout=DOWNLOAD_TIMEOUT)
+    response.raise_for_status()
+    if "image" not in response.headers.get("content-type", ""):
+        raise ValueError(f"Drive returned {response.headers.get('content-type')!r}, not an image")
+    return response.content
+
+
+def _read(path):
+    with open(path, "rb") as fh:
+        return fh.read()
+
+
+def _fetch(name):
+    file_id, bundled = ASSETS[name]
+    if os.path.exists(bundled):
+        return _decode(_read(bundled))
+
+    cached = os.path.join(CACHE_DIR, f"{name}.png")
+    fresh = os.path.exists(cached) and time.time() - os.path.getmtime(cached) < CACHE_MAX_AGE
+    if fresh:
+        try:
+            return _decode(_read(cached))
+        except Exception:
+            log.warning("Cached %s is corrupt; downloading again", name)
+    try:
+        data = _download(file_id)
+        image = _decode(data)
+    except Exception:
+        if not os.path.exists(cached):
+            raise
+        # Drive is unreachable; a stale copy beats no letterhead
+        log.warning("Could not refresh %s from Drive; using cached copy", name, exc_info=True)
+        return _decode(_read(cached))
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    tmp = f"{cached}.tmp-{os.getpid()}"
+    with open(tmp, "wb") as fh:
+        fh.write(data)
+    os.replace(tmp, cached)
+    return image
+
+
+def get_asset(name):
+    """Decoded image for ``name``, or None if it can't be loaded.
+
+    Loaded once per process: from assets/ when bundled there, otherwise
+    from the on-disk Drive cache, downloading only when it is missing or
+    stale.
+    """
+    with _lock:
+        loaded = _images.get(name)
+        if loaded is None or (loaded[1] is None and time.time() - loaded[0] >= RETRY_AFTER):
+            try:
+                image = _fetch(name)
+            except Exception:
+                log.warning("Payslip %s unavailable", name, exc_info=True)
+                image = None
+            loaded = _images[name] = (time.time(), image)
+        return loaded[1]
+
@@ -0,0 +1,308 @@
+# Payslip PDF rendering, spread over a process pool for bulk payroll runs
+import copy
+import multiprocessing
+import os
+import tempfile
+import threading
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from fpdf import FPDF
+from pages.hr.payslip_assets import get_asset
+
+# Employees per task sent to a worker process
+CHUNK_SIZE = 25
+
+
+# --- UTILS ---
+def format_currency(amount):
+    return f"{amount:,.2f}"
+
+
+def payslip_records(df, company_name, company_address, pay_date, working_days):
+    """One payslip data dict per row of an ingested payroll frame, plus the row's email.
+
+    ``df`` comes from :func:`pages.hr.payroll.ingest_payroll`, so the money
+    columns are already floats.
+    """
+    run = {
+        "company_name": company_name,
+        "company_address": company_address,
+        "pay_date": pay_date.strftime("%Y-%m-%d"),
+        "working_days": working_days,
+    }
+    rows = df[["employee_name", "employee_id", *CURRENCY_FIELDS, "email"]].to_dict("records")
+    return [{**run, **row} for row in rows]
+
+
+def payslip_filename(data):
+    return f"{str(data['employee_name']).replace(' ', '_')}_payslip.pdf"
+
+
+# --- PDF GENERATOR ---
+# Fields that change per employee; everything else is static for a run
+CURRENCY_FIELDS = (
+    "basic_pay", "Housing", "Transport", "other_allowances", "tax", "employee_pension",
+    "other_deductions", "total_earnings", "total_deductions", "net_pay",
+)
+
+
+def _field_text(data, field):
+    value = data[field]
+    return format_currency(value) if field in CURRENCY_FIELDS else f"{value}"
+
+
+def _labelled_cell(pdf, slots, w, h, label, field, ln=False, align='L'):
+    # Draws the static part of a "Label: value" box and records where the
+    # value goes; centred boxes are stamped whole since their text moves
+    x, y = pdf.get_x(), pdf.get_y()
+    w = w or pdf.w - pdf.r_margin - x
+    style, size = pdf.font_style, pdf.font_size_pt
+    if align == 'L':
+        pdf.cell(w, h, txt=label, ln=ln, border=1)
+        offset = pdf.get_string_width(label)
+        slots.append((field, x + offset, y, w - offset, h, style, size, 'L', ""))
+    else:
+        pdf.cell(w, h, txt="", ln=ln, border=1)
+        slots.append((field, x, y, w, h, style, size, align, label))
+
+
+def draw_static(pdf, run):
+    """Add a payslip page with everything but the employee's fields.
+
+    ``run`` holds the company name/address, pay date and working days.
+    Returns the slots that :func:`stamp_fields` fills in.
+    """
+    slots = []
+    pdf.add_page()
+
+    # Letterhead and logo are decoded once and shared by every payslip
+    letterhead = get_asset("letterhead")
+    if letterhead is not None:
+        pdf.image(letterhead, x=0, y=0, w=210, h=297)
+    logo = get_asset("logo")
+    if logo is not None:
+        pdf.image(logo, x=150, y=10, w=40)
+
+    pdf.ln(30)
+
+    pdf.set_font("Arial", style="B", size=18)
+    pdf.cell(0, 15, txt="PAYSLIP", ln=True, align='C', border=1)
+    pdf.ln(5)
+
+    pdf.set_font("Arial", style="", size=12)
+    pdf.cell(0, 10, txt=run["company_name"], ln=True, align='C', border=1)
+    pdf.cell(0, 10, txt=run["company_address"], ln=True, align='C', border=1)
+    pdf.ln(10)
+
+    pdf.cell(95, 10, txt=f"Pay Date: {run['pay_date']}", ln=False, border=1)
+    _labelled_cell(pdf, slots, 95, 10, "Employee Name: ", "employee_name", ln=True)
+    pdf.cell(95, 10, txt=f"Working Days: {run['working_days']}", ln=False, border=1)
+    _labelled_cell(pdf, slots, 95, 10, "Employee ID: ", "employee_id", ln=True)
+    pdf.ln(10)
+
+    pdf.set_font("Arial", style="B", size=12)
+    pdf.cell(95, 10, txt="EARNINGS", ln=False, border=1)
+    pdf.cell(90, 10, txt="DEDUCTIONS", ln=True, border=1)
+
+    pdf.set_font("Arial", size=12)
+
+    _labelled_cell(pdf, slots, 95, 10, "Basic Pay: ", "basic_pay")
+    _labelled_cell(pdf, slots, 90, 10, "Tax: ", "tax", ln=True)
+    _labelled_cell(pdf, slots, 95, 10, "Housing: ", "Housing")
+    _labelled_cell(pdf, slots, 90, 10, "Pension (Employee): ", "employee_pension", ln=True)
+    _labelled_cell(pdf, slots, 95, 10, "Transport: ", "Transport")
+    _labelled_cell(pdf, slots, 90, 10, "Other Deductions: ", "other_deductions", ln=True)
+    _labelled_cell(pdf, slots, 95, 10, "Other Allowances: ", "other_allowances")
+    pdf.ln(10)
+
+    pdf.set_font("Arial", style="B", size=12)
+    _labelled_cell(pdf, slots, 95, 10, "Total Earnings: ", "total_earnings")
+    _labelled_cell(pdf, slots, 90, 10, "Total Deductions: ", "total_deductions", ln=True)
+
+    pdf.ln(5)
+    pdf.set_font("Arial", style="B", size=14)
+    _labelled_cell(pdf, slots, 0, 12, "Net Pay: ", "net_pay", ln=True, align='C')
+    return slots
+
+
+def stamp_fields(pdf, slots, data):
+    for field, x, y, w, h, style, size, align, prefix in slots:
+        pdf.set_font("Arial", style=style, size=size)
+        pdf.set_xy(x, y)
+        pdf.cell(w, h, txt=prefix + _field_text(data, field), align=align)
+
+
+def draw_payslip(pdf, data):
+    """Add one payslip page for ``data`` to ``pdf``."""
+    stamp_fields(pdf, draw_static(pdf, data), data)
+
+
+class PayslipTemplate:
+    """A payslip page laid out once per run; each payslip only stamps its fields.
+
+    The images and static text are placed (and the images compressed) once;
+    rendering copies that document and writes the dozen per-employee values.
+    """
+
+    def __init__(self, run):
+        self._base = FPDF()
+        self._slots = draw_static(self._base, run)
+
+    def render(self, data):
+        pdf = copy.deepcopy(self._base)
+        stamp_fields(pdf, self._slots, data)
+        return bytes(pdf.output())
+
+
+RUN_FIELDS = ("company_name", "company_address", "pay_date", "working_days")
+_templates = {}   # run fields -> PayslipTemplate, per process
+
+
+def get_template(data):
+    key = tuple(data[field] for field in RUN_FIELDS)
+    template = _templates.get(key)
+    if template is None:
+        # Runs are one at a time in practice; keep only the latest few
+        if len(_templates) >= 4:
+            _templates.clear()
+        template = _templates[key] = PayslipTemplate(dict(zip(RUN_FIELDS, key)))
+    return template
+
+
+def generate_pdf(data):
+    return get_template(data).render(data)
+
+
+# --- BULK RENDERING ---
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+    # One pool per server process; workers keep their decoded assets warm
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # Never fork the Streamlit server: its threads may hold locks
+            # that a forked child would inherit locked
+            method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            _pool = ProcessPoolExecutor(max_workers=os.cpu_count() or 1,
+                                        mp_context=multiprocessing.get_context(method))
+        return _pool
+
+
+def _reset_pool():
+    global _pool
+    with _pool_lock:
+        _pool = None
+
+
+def _result(index, data, pdf=None, error=None):
+    return {"index": index, "employee_name": data["employee_name"],
+            "employee_id": data["employee_id"], "email": data.get("email"),
+            "filename": payslip_filename(data), "pdf": pdf, "error": error}
+
+
+def _render_chunk(chunk):
+    results = []
+    for index, data in chunk:
+        try:
+            results.append(_result(index, data, pdf=generate_pdf(data)))
+        except Exception as e:
+            results.append(_result(index, data, error=str(e)))
+    return results
+
+
+def _render_merged(records):
+    # Within one document fpdf embeds the shared letterhead and logo once
+    pdf = FPDF()
+    for data in records:
+        draw_payslip(pdf, data)
+    return bytes(pdf.output())
+
+
+def render_payslips(records, chunk_size=CHUNK_SIZE):
+    """Render ``records`` across every CPU core, yielding one result per employee.
+
+    Results arrive in completion order as dicts with the employee's name, id,
+    email, filename and either ``pdf`` bytes or an ``error`` message.
+    """
+    indexed = list(enumerate(records))
+    # Small runs still get spread over every worker
+    workers = os.cpu_count() or 1
+    chunk_size = max(1, min(chunk_size, -(-len(indexed) // workers)))
+    chunks = [indexed[i:i + chunk_size] for i in range(0, len(indexed), chunk_size)]
+    futures = {_get_pool().submit(_render_chunk, chunk): chunk for chunk in chunks}
+    for future in as_completed(futures):
+        # Let go of each finished chunk as it is handed on, so PDFs that have
+        # already been yielded aren't kept alive until the whole run ends
+        chunk = futures.pop(future)
+        try:
+            results = future.result()
+        except Exception as e:
+            # The worker itself died; report every employee of its chunk
+            if isinstance(e, BrokenProcessPool):
+                _reset_pool()
+            results = [_result(index, data, error=str(e)) for index, data in chunk]
+        del future, chunk
+        yield from results
+        del results
+
+
+# --- BUNDLES ---
+# Bundles stay in memory up to this size, then spill to a temp file
+SPOOL_MAX_SIZE = 32 * 1024 * 1024
+
+
+def bundle_bytes(bundle_file):
+    """The whole contents of a bundle file, for ``st.download_button``."""
+    bundle_file.seek(0)
+    return bundle_file.read()
+
+
+def _zip_name(filename, employee_id, used):
+    if filename not in used:
+        return filename
+    stem, ext = os.path.splitext(filename)
+    return f"{stem}_{employee_id}{ext}"
+
+
+def build_payslip_bundle(records, merged=False, on_progress=None):
+    """Render ``records`` into one ZIP and, optionally, one merged PDF.
+
+    Each payslip is written into the ZIP as soon as its worker returns it
+    and dropped once written, so only chunks still waiting to be written are
+    held in memory. Returns
+    ``(zip_file, merged_file, errors)``: spooled files positioned at the
+    start (``merged_file`` is None unless requested) and the failed results.
+    """
+    merged_future = _get_pool().submit(_render_merged, records) if merged and records else None
+    zip_file = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    errors, used = [], set()
+    with zipfile.ZipFile(zip_file, "w", zipfile.ZIP_DEFLATED) as zf:
+        for done, result in enumerate(render_payslips(records), start=1):
+            if result["error"]:
+                errors.append(result)
+            else:
+                name = _zip_name(result["filename"], result["employee_id"], used)
+                used.add(name)
+                zf.writestr(name, result["pdf"])
+            if on_progress is not None:
+                on_progress(done, len(records))
+    zip_file.seek(0)
+
+    merged_file = None
+    if merged_future is not None:
+        merged_file = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+        try:
+            merged_file.write(merged_future.result())
+        except Exception as e:
+            if isinstance(e, BrokenProcessPool):
+                _reset_pool()
+            merged_file = None
+            errors.append({"index": None, "employee_name": "Merged PDF", "employee_id": None,
+                           "email": None, "filename": None, "pdf": None, "error": str(e)})
+        else:
+            merged_file.seek(0)
+    return zip_file, merged_file, errors
@@ -2,41 +2,21 @@
 import streamlit as st
 import pandas as pd
 from datetime import date
-from st_aggrid import AgGrid, GridOptionsBuilder, GridUpdateMode
 import plotly.express as px
-from utils.auth import get_gspread_client
+from utils.grid import paged_grid
+from utils.reference_data import get_clients, get_sellers
+from utils.rollups import current_totals, for_display, get_rollup, rollup
+from utils.sheets import invalidate_tab, load_tab, render_quarantine
+from utils.writeback import save_grid_edits
+from utils.write_queue import queue_row
 
 def render_ghs_trade():
     TRADE_SHEET_KEY = "1eQS-LZLfsGmhySVHS6ETaKNmBP6bRngtDUiy-Nq0YXw"
     TRADE_TAB = "GHS Trade"
-    DATABASE_SHEET_KEY = "1j_D2QiaS3IEJuNI27OA56l8nWWatzxidLKuqV4Dfet4"
-    CLIENT_TAB = "Client List"
-    SELLER_TAB = "Seller List"
 
-    @st.cache_data(ttl=60)
-    def load_clients():
-        client = get_gspread_client()
-        sheet = client.open_by_key(DATABASE_SHEET_KEY)
-        return pd.DataFrame(sheet.worksheet(CLIENT_TAB).get_all_records()).iloc[:, 0].dropna().tolist()
-
-    @st.cache_data(ttl=60)
-    def load_sellers():
-        client = get_gspread_client()
-        sheet = client.open_by_key(DATABASE_SHEET_KEY)
-        return pd.DataFrame(sheet.worksheet(SELLER_TAB).get_all_records()).iloc[:, 0].dropna().tolist()
-
-    @st.cache_data(ttl=60)
-    def load_trades():
-        client = get_gspread_client()
-        sheet = client.open_by_key(TRADE_SHEET_KEY)
-        ws = sheet.worksheet(TRADE_TAB)
-        df = pd.DataFrame(ws.get_all_records())
-        return df, ws
-
-    clients = load_clients()
-    sellers = load_sellers()
-    df, worksheet = load_trades()
-    df.columns = df.columns.str.strip().str.title()
+    clients = get_clients()
+    sellers = get_sellers()
+    df = load_tab(TRADE_SHEET_KEY, TRADE_TAB)
 
     st.markdown("### 🇬🇭 GHS Trade Entry")
 
@@ -83,65 +63,41 @@ def render_ghs_trade():
             "Trade Customer 2": customer2,
             "Trade Size 2": round(trade_size2, 2)
         }
-        safe_row = [[str(v) if pd.isna(v) else v for v in new_row.values()]]
-        worksheet.append_rows(safe_row)
-        st.success("✅ GHS trade submitted successfully!")
-        st.rerun()
+        safe_row = [str(v) if pd.isna(v) else v for v in new_row.values()]
+        queue_row(TRADE_SHEET_KEY, TRADE_TAB, safe_row)
+        st.success("✅ GHS trade queued for saving.")
+
+    render_quarantine(TRADE_SHEET_KEY, TRADE_TAB)
 
     st.markdown("### 📋 Trade Table")
     col_refresh, _ = st.columns([1, 9])
     with col_refresh:
         if st.button("🔄 Refresh Data", key="ghs_refresh_btn"):
-            st.cache_data.clear()
+            invalidate_tab(TRADE_SHEET_KEY, TRADE_TAB)
             st.rerun()
 
     if not df.empty:
-        df["Date"] = pd.to_datetime(df["Date"], errors="coerce")
-        df = df[df["Date"].notna()]
         start = st.date_input("📅 Start Date", df["Date"].min().date(), key="ghs_start")
         end = st.date_input("📅 End Date", df["Date"].max().date(), key="ghs_end")
         df_filtered = df[(df["Date"] >= pd.to_datetime(start)) & (df["Date"] <= pd.to_datetime(end))]
 
-        gb = GridOptionsBuilder.from_dataframe(df_filtered)
-        gb.configure_pagination()
-        gb.configure_default_column(editable=True, filter=True, resizable=True)
-        grid_response = AgGrid(
-            df_filtered,
-            gridOptions=gb.build(),
-            update_mode=GridUpdateMode.VALUE_CHANGED,
-            fit_columns_on_grid_load=True,
-            height=350
-        )
+        page, grid_response = paged_grid(df_filtered, key="ghs_trade", height=350)
 
         updated_df = grid_response["data"]
-        if not updated_df.equals(df_filtered):
-            worksheet.update([updated_df.columns.values.tolist()] + updated_df.values.tolist())
+        if save_grid_edits(TRADE_SHEET_KEY, TRADE_TAB, page, updated_df):
             st.success("✅ Table updates saved!")
 
         st.markdown("### 📊 Summary")
-        df_filtered["Week"] = df_filtered["Date"].dt.isocalendar().week
-        df_filtered["Month"] = df_filtered["Date"].dt.month
-
-        summary = {
-            "Period": ["Daily", "Weekly", "Monthly"],
-            "Income": [
-                df_filtered[df_filtered["Date"] == pd.to_datetime(date.today())]["Income"].sum(),
-                df_filtered[df_filtered["Week"] == date.today().isocalendar().week]["Income"].sum(),
-                df_filtered[df_filtered["Month"] == date.today().month]["Income"].sum()
-            ],
-            "Amount GHS": [
-                df_filtered[df_filtered["Date"] == pd.to_datetime(date.today())]["Amount Ghs"].sum(),
-                df_filtered[df_filtered["Week"] == date.today().isocalendar().week]["Amount Ghs"].sum(),
-                df_filtered[df_filtered["Month"] == date.today().month]["Amount Ghs"].sum()
-            ]
-        }
-        df_summary = pd.DataFrame(summary)
+        measures = ["Income", "Amount Ghs"]
+        # Measures the tab doesn't have show as zero instead of failing
+        daily = get_rollup(TRADE_SHEET_KEY, TRADE_TAB, "Daily", start, end).reindex(columns=measures, fill_value=0)
+        df_summary = current_totals(daily=daily)
         st.dataframe(df_summary.style.set_properties(**{
             'font-weight': 'bold', 'background-color': '#e8f5e9', 'color': '#000'
         }), use_container_width=True)
 
         st.markdown("### 📈 Weekly Income Chart")
-        chart = df_filtered.groupby("Week")["Income"].sum().reset_index()
+        chart = for_display(rollup(period="Weekly", daily=daily[["Income"]]), "Week")
         fig = px.bar(chart, x="Week", y="Income", title="Weekly GHS Trade Income")
         st.plotly_chart(fig, use_container_width=True)
     else:
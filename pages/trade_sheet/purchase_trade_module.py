@@ -3,37 +3,23 @@ import streamlit as st
 import pandas as pd
 import time
 from datetime import date
-from st_aggrid import AgGrid, GridOptionsBuilder, GridUpdateMode
+from st_aggrid import GridUpdateMode
 import plotly.express as px
-from utils.auth import get_gspread_client
+from utils.grid import paged_grid
+from utils.reference_data import get_sellers
+from utils.rollups import for_display, get_rollup
+from utils.sheets import invalidate_tab, load_tab, render_quarantine
+from utils.write_queue import queue_row
 
 def render_purchase_trade():
     # --- CONFIG ---
     TRADE_SHEET_KEY = "1eQS-LZLfsGmhySVHS6ETaKNmBP6bRngtDUiy-Nq0YXw"
     TRADE_TAB = "Purchase Trade"
-    DATABASE_SHEET_KEY = "1j_D2QiaS3IEJuNI27OA56l8nWWatzxidLKuqV4Dfet4"
-    SELLER_TAB = "Seller List"
-
-    @st.cache_data(ttl=60)
-    def load_seller_list():
-        client = get_gspread_client()
-        db_sheet = client.open_by_key(DATABASE_SHEET_KEY)
-        seller_ws = db_sheet.worksheet(SELLER_TAB)
-        df = pd.DataFrame(seller_ws.get_all_records())
-        return df.iloc[:, 0].dropna().tolist()
-
-    @st.cache_data(ttl=60)
-    def load_trade_data():
-        client = get_gspread_client()
-        trade_sheet = client.open_by_key(TRADE_SHEET_KEY)
-        ws = trade_sheet.worksheet(TRADE_TAB)
-        df = pd.DataFrame(ws.get_all_records())
-        return df, ws
 
     st.subheader("💱 Purchase Trade")
 
-    seller_data = load_seller_list()
-    df_trade, worksheet = load_trade_data()
+    seller_data = get_sellers()
+    df_trade = load_tab(TRADE_SHEET_KEY, TRADE_TAB)
 
     # --- Form ---
     with st.form("purchase_trade_form", clear_on_submit=False):
@@ -64,32 +50,21 @@ def render_purchase_trade():
                 "Naira Paid": naira_paid,
                 "Naira Balance": naira_balance
             }
-            worksheet.append_rows([list(new_row.values())])
-            st.success("Trade added successfully.")
-            st.rerun()
+            queue_row(TRADE_SHEET_KEY, TRADE_TAB, list(new_row.values()))
+            st.success("Trade queued for saving.")
+
+    render_quarantine(TRADE_SHEET_KEY, TRADE_TAB)
 
     if st.button("🔄 Refresh Data"):
-        st.cache_data.clear()
+        invalidate_tab(TRADE_SHEET_KEY, TRADE_TAB)
         st.rerun()
 
     st.markdown("### 📋 Trade Table")
-    gb = GridOptionsBuilder.from_dataframe(df_trade)
-    gb.configure_pagination()
-    gb.configure_default_column(editable=False)
-
-    AgGrid(
-        df_trade,
-        gridOptions=gb.build(),
-        update_mode=GridUpdateMode.NO_UPDATE,
-        fit_columns_on_grid_load=True,
-        height=400,
-        reload_data=False
-    )
+    paged_grid(df_trade, key="purchase_trade", editable=False, row_numbers=False,
+               update_mode=GridUpdateMode.NO_UPDATE)
 
     st.markdown("### 📊 Summary and Chart Filters")
-    if "Date" in df_trade.columns:
-        df_trade["Date"] = pd.to_datetime(df_trade["Date"], errors="coerce")
-        df_trade = df_trade[df_trade["Date"].notna()]
+    if not df_trade.empty and "Date" in df_trade.columns:
 
         start = st.date_input("📅 Start Date", df_trade["Date"].min().date())
         end = st.date_input("📅 End Date", df_trade["Date"].max().date())
@@ -97,15 +72,14 @@ def render_purchase_trade():
 
         required_cols = ["Buy/Sell", "Trade Size", "NGN Amount"]
         if all(col in df_filtered.columns for col in required_cols):
-            summary = df_filtered.groupby("Buy/Sell")[["Trade Size", "NGN Amount"]].sum().round(2)
+            summary = df_filtered.groupby("Buy/Sell", observed=True)[["Trade Size", "NGN Amount"]].sum().round(2)
             st.dataframe(summary)
         else:
             st.warning("⚠️ Summary table not shown. Required columns are missing.")
 
         if "Trade Size" in df_filtered.columns:
             st.markdown("### 📈 Weekly Trade Size")
-            df_filtered["Week"] = df_filtered["Date"].dt.to_period("W").astype(str)
-            weekly_chart = df_filtered.groupby("Week")["Trade Size"].sum().reset_index()
+            weekly_chart = for_display(get_rollup(TRADE_SHEET_KEY, TRADE_TAB, "Weekly", start, end)[["Trade Size"]], "Week")
             fig = px.bar(weekly_chart, x="Week", y="Trade Size", title="Weekly Trade Size")
             st.plotly_chart(fig, use_container_width=True)
         else:
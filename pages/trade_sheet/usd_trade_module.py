@@ -4,37 +4,22 @@ import pandas as pd
 import time
 from datetime import date
 import plotly.express as px
-import io
-import xlsxwriter
-from st_aggrid import AgGrid, GridOptionsBuilder, GridUpdateMode
-from utils.auth import get_gspread_client
+from utils.export_utils import export_download
+from utils.grid import paged_grid
+from utils.reference_data import get_clients
+from utils.rollups import current_totals, for_display, get_rollup, rollup
+from utils.sheets import invalidate_tab, load_tab, render_quarantine
+from utils.writeback import grid_changes
+from utils.write_queue import queue_row
 
 def render_usd_trade():
     # --- CONFIG ---
     TRADE_SHEET_KEY = "1eQS-LZLfsGmhySVHS6ETaKNmBP6bRngtDUiy-Nq0YXw"
     TRADE_TAB = "USD Trade"
-    DATABASE_SHEET_KEY = "1j_D2QiaS3IEJuNI27OA56l8nWWatzxidLKuqV4Dfet4"
-    CLIENT_TAB = "Client List"
-
-    @st.cache_data(ttl=60)
-    def load_clients():
-        client = get_gspread_client()
-        sheet = client.open_by_key(DATABASE_SHEET_KEY)
-        df = pd.DataFrame(sheet.worksheet(CLIENT_TAB).get_all_records())
-        return df.iloc[:, 0].dropna().tolist()
-
-    @st.cache_data(ttl=60)
-    def load_usd_trades():
-        client = get_gspread_client()
-        sheet = client.open_by_key(TRADE_SHEET_KEY)
-        ws = sheet.worksheet(TRADE_TAB)
-        df = pd.DataFrame(ws.get_all_records())
-        return df, ws
 
     # --- Load Data ---
-    client_list = load_clients()
-    df, worksheet = load_usd_trades()
-    df.columns = df.columns.str.strip().str.title()
+    client_list = get_clients()
+    df = load_tab(TRADE_SHEET_KEY, TRADE_TAB)
 
     st.subheader("💵 USD Trade Entry")
     with st.form("usd_trade_form", clear_on_submit=False):
@@ -72,86 +57,52 @@ def render_usd_trade():
             "Income": round(ngn_income, 2),
             "Buy Rate": round(buy_rate, 2)
         }
-        safe_row = [[str(v) if pd.isna(v) else v for v in new_row.values()]]
-        worksheet.append_rows(safe_row)
-        st.success("✅ Trade submitted successfully!")
-        st.rerun()
+        safe_row = [str(v) if pd.isna(v) else v for v in new_row.values()]
+        queue_row(TRADE_SHEET_KEY, TRADE_TAB, safe_row)
+        st.success("✅ Trade queued for saving.")
+
+    render_quarantine(TRADE_SHEET_KEY, TRADE_TAB)
 
     # --- Refresh Button Positioned Near Table ---
     st.markdown("### 📋 Trade Table")
     col_refresh, _ = st.columns([1, 9])
     with col_refresh:
         if st.button("🔄 Refresh Data", key="usd_refresh_btn"):
-            st.cache_data.clear()
+            invalidate_tab(TRADE_SHEET_KEY, TRADE_TAB)
             st.rerun()
 
     # --- Editable Table with Pagination ---
     if not df.empty:
-        gb = GridOptionsBuilder.from_dataframe(df)
-        gb.configure_pagination()
-        gb.configure_default_column(editable=True, filter=True, resizable=True)
-        grid_response = AgGrid(
-            df,
-            gridOptions=gb.build(),
-            update_mode=GridUpdateMode.VALUE_CHANGED,
-            fit_columns_on_grid_load=True,
-            height=400
-        )
-        updated_df = grid_response["data"]
-        if not updated_df.equals(df):
-            st.info("⚠️ Edits are not saved back to Google Sheet. Please export manually if needed.")
+        page, grid_response = paged_grid(df, key="usd_trade")
+        edited = grid_changes(page, grid_response["data"]).updated
+        if edited:
+            st.info(f"⚠️ Edits to {len(edited)} row(s) are not saved back to Google Sheet. "
+                    "Please export manually if needed.")
     else:
         st.info("ℹ️ No trade data available to display.")
 
     # --- Summary & Chart ---
     if not df.empty and "Date" in df.columns:
-        df["Date"] = pd.to_datetime(df["Date"], errors="coerce")
-        df = df[df["Date"].notna()]
         start = st.date_input("📅 Start Date", df["Date"].min().date(), key="usd_start_date")
         end = st.date_input("📅 End Date", df["Date"].max().date(), key="usd_end_date")
         df_filtered = df[(df["Date"] >= pd.to_datetime(start)) & (df["Date"] <= pd.to_datetime(end))]
 
-        for col in ["Trade Size", "Amount", "Income"]:
-            df_filtered[col] = pd.to_numeric(df_filtered[col], errors="coerce")
-
-        df_filtered["Week"] = df_filtered["Date"].dt.isocalendar().week
-        df_filtered["Month"] = df_filtered["Date"].dt.month
-
-        summary = {
-            "Period": ["Daily", "Weekly", "Monthly"],
-            "Trade Size": [
-                df_filtered[df_filtered["Date"] == pd.to_datetime(date.today())]["Trade Size"].sum(),
-                df_filtered[df_filtered["Week"] == date.today().isocalendar().week]["Trade Size"].sum(),
-                df_filtered[df_filtered["Month"] == date.today().month]["Trade Size"].sum()
-            ],
-            "Amount": [
-                df_filtered[df_filtered["Date"] == pd.to_datetime(date.today())]["Amount"].sum(),
-                df_filtered[df_filtered["Week"] == date.today().isocalendar().week]["Amount"].sum(),
-                df_filtered[df_filtered["Month"] == date.today().month]["Amount"].sum()
-            ],
-            "Income": [
-                df_filtered[df_filtered["Date"] == pd.to_datetime(date.today())]["Income"].sum(),
-                df_filtered[df_filtered["Week"] == date.today().isocalendar().week]["Income"].sum(),
-                df_filtered[df_filtered["Month"] == date.today().month]["Income"].sum()
-            ]
-        }
-        df_summary = pd.DataFrame(summary)
+        measures = ["Trade Size", "Amount", "Income"]
+        # Measures the tab doesn't have show as zero instead of failing
+        daily = get_rollup(TRADE_SHEET_KEY, TRADE_TAB, "Daily", start, end).reindex(columns=measures, fill_value=0)
+        df_summary = current_totals(daily=daily)
         st.dataframe(df_summary.style.set_properties(**{
             'font-weight': 'bold', 'background-color': '#f0f4c3', 'color': '#000'
         }), use_container_width=True)
 
         st.markdown("### 📈 Weekly Trade Size")
-        chart = df_filtered.groupby("Week")["Trade Size"].sum().reset_index()
+        chart = for_display(rollup(period="Weekly", daily=daily[["Trade Size"]]), "Week")
         fig = px.bar(chart, x="Week", y="Trade Size", title="Weekly Trade Volume")
         st.plotly_chart(fig, use_container_width=True)
 
         st.markdown("### 📤 Export Summary")
-        excel_out = io.BytesIO()
-        with pd.ExcelWriter(excel_out, engine="xlsxwriter") as writer:
-            df_summary.to_excel(writer, index=False, sheet_name="Summary")
-            chart.to_excel(writer, index=False, sheet_name="Chart")
-        st.download_button("⬇️ Download Excel", data=excel_out.getvalue(),
-                           file_name="usd_trade_summary.xlsx",
-                           mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+        export_download({"Summary": df_summary, "Chart": chart}, "usd_trade_summary",
+                        "Summary", key="usd_trade_summary")
+        export_download(df_filtered, "usd_trade_history", "Trades", key="usd_trade_history")
     else:
         st.warning("No trades found for the selected date range.")
@@ -0,0 +1,56 @@
+# Table exports: every format round-trips through a per-request buffer
+import io
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+from utils.export_utils import export_buffer, export_bytes
+
+
+@pytest.fixture
+def trades():
+    return pd.DataFrame({
+        "Date": pd.to_datetime(["2024-01-01", "2024-01-02", None]),
+        "Client": ["Ada", "₦ Bola", None],
+        "Trade Size": [1000.5, 2500.0, float("nan")],
+        "Count": [1, 2, 3],
+    })
+
+
+def test_xlsx_round_trip(trades):
+    data = export_bytes({"Trades": trades, "Empty": trades.head(0)}, "xlsx")
+    books = pd.read_excel(io.BytesIO(data), sheet_name=None)
+    assert list(books) == ["Trades", "Empty"]
+    assert books["Trades"]["Client"].tolist()[:2] == ["Ada", "₦ Bola"]
+    assert books["Trades"]["Trade Size"].tolist()[:2] == [1000.5, 2500.0]
+    assert books["Empty"].columns.tolist() == trades.columns.tolist()
+
+
+def test_csv_round_trip(trades):
+    back = pd.read_csv(io.BytesIO(export_bytes(trades, "csv")))
+    assert back["Count"].tolist() == [1, 2, 3]
+    assert back["Client"].tolist()[:2] == ["Ada", "₦ Bola"]
+
+
+def test_parquet_round_trip(trades):
+    back = pq.read_table(io.BytesIO(export_bytes(trades, "parquet"))).to_pandas()
+    assert back["Trade Size"].tolist()[:2] == [1000.5, 2500.0]
+    assert back["Client"].tolist()[:2] == ["Ada", "₦ Bola"]
+    assert back["Client"].isna().tolist() == [False, False, True]
+
+
+def test_pdf_export(trades):
+    assert export_bytes(trades, "pdf").startswith(b"%PDF")
+    assert export_bytes(trades.head(0), "pdf").startswith(b"%PDF")
+
+
+def test_each_export_gets_its_own_buffer(trades):
+    first, second = export_buffer(trades, "csv"), export_buffer(trades, "csv")
+    assert first is not second
+    assert first.read() == second.read()
+
+
+def test_unsupported_requests_are_rejected(trades):
+    with pytest.raises(ValueError):
+        export_bytes(trades, "docx")
+    with pytest.raises(ValueError):
+        export_bytes({"Trades": trades}, "csv")
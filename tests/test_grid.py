@@ -0,0 +1,51 @@
+# Server-side filtering and sorting for paged grids
+import pandas as pd
+import pytest
+from utils.grid import filter_frame, sort_frame
+
+
+@pytest.fixture
+def trades():
+    return pd.DataFrame({
+        "Date": pd.to_datetime(["2024-01-01 09:30", "2024-01-15 00:00", "2024-02-01 00:00"]),
+        "Client": ["Ada Obi", "Bola", None],
+        "Trade Size": [100.0, 2500.0, 40.0],
+    }, index=[2, 3, 4])
+
+
+@pytest.mark.parametrize("query, rows", [
+    (">100", [3]),
+    (">=100", [2, 3]),
+    ("1,000..3,000", [3]),
+    ("=40", [4]),
+    ("!=40", [2, 3]),
+    ("abc", []),
+    ("", [2, 3, 4]),
+])
+def test_numeric_filters(trades, query, rows):
+    assert filter_frame(trades, "Trade Size", query).index.tolist() == rows
+
+
+@pytest.mark.parametrize("query, rows", [
+    ("2024-01-01", [2]),
+    ("<2024-01-31", [2, 3]),
+    ("2024-01-10..2024-02-28", [3, 4]),
+    ("someday", []),
+])
+def test_date_filters(trades, query, rows):
+    assert filter_frame(trades, "Date", query).index.tolist() == rows
+
+
+def test_text_filter_is_case_insensitive_substring(trades):
+    assert filter_frame(trades, "Client", "OBI").index.tolist() == [2]
+    assert filter_frame(trades, "Client", "a").index.tolist() == [2, 3]
+
+
+def test_unknown_column_is_ignored(trades):
+    assert filter_frame(trades, "Missing", ">1").index.tolist() == [2, 3, 4]
+
+
+def test_sort_keeps_sheet_rows_and_puts_blanks_last(trades):
+    assert sort_frame(trades, "Trade Size").index.tolist() == [4, 2, 3]
+    assert sort_frame(trades, "Client", ascending=False).index.tolist() == [3, 2, 4]
+    assert sort_frame(trades, "Missing").index.tolist() == [2, 3, 4]
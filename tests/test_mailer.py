@@ -0,0 +1,182 @@
+# Payslip mailer against an in-process SMTP stand-in
+import smtplib
+import socketserver
+import threading
+import time
+import pytest
+from pages.hr import mailer
+from pages.hr.mailer import FAILED, SENT, Mailer, _RateLimiter, build_message, is_retryable
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.connections += 1
+        self.reply("220 stub ESMTP")
+        recipients = []
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode().strip()
+            verb = command.split(" ", 1)[0].upper()
+            if verb in ("EHLO", "HELO"):
+                self.reply("250 stub")
+            elif verb == "MAIL":
+                recipients = []
+                self.reply("250 OK")
+            elif verb == "RCPT":
+                address = command.split(":", 1)[1].strip().strip("<>")
+                with server.lock:
+                    codes = server.rcpt_codes.get(address, [])
+                    code = codes.pop(0) if codes else 250
+                if code == 250:
+                    recipients.append(address)
+                    self.reply("250 OK")
+                else:
+                    self.reply(f"{code} refused by stub")
+            elif verb == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                while self.rfile.readline() not in (b".\r\n", b""):
+                    pass
+                with server.lock:
+                    server.delivered.extend(recipients)
+                self.reply("250 OK queued")
+            elif verb == "RSET":
+                recipients = []
+                self.reply("250 OK")
+            elif verb == "NOOP":
+                self.reply("250 OK")
+            elif verb == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+
+class _SMTPStub(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _SMTPHandler)
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.delivered = []
+        # recipient -> RCPT reply codes for its next attempts (250 once exhausted)
+        self.rcpt_codes = {}
+
+
+@pytest.fixture
+def smtp_stub():
+    server = _SMTPStub()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(mailer, "BACKOFF_BASE", 0.0)
+    monkeypatch.setattr(mailer.random, "uniform", lambda a, b: 0.0)
+
+
+def _message(to):
+    return build_message("payroll@example.com", to, "Your Monthly Payslip", "Attached.", b"%PDF-1.4", "p.pdf")
+
+
+def _send(server, recipients, **kwargs):
+    with Mailer("127.0.0.1", server.server_address[1], starttls=False, rate_limit=0, **kwargs) as m:
+        futures = [m.submit(to, _message(to)) for to in recipients]
+        return {result["key"]: result for result in m.results(futures)}
+
+
+def test_sends_every_message_over_pooled_sessions(smtp_stub):
+    recipients = [f"employee{i}@example.com" for i in range(12)]
+    results = _send(smtp_stub, recipients, pool_size=3)
+
+    assert all(r["status"] == SENT and r["attempts"] == 1 for r in results.values())
+    assert sorted(smtp_stub.delivered) == sorted(recipients)
+    # One login per worker, not per message
+    assert smtp_stub.connections <= 3
+
+
+def test_temporary_refusal_is_retried(smtp_stub):
+    smtp_stub.rcpt_codes["busy@example.com"] = [451, 451]
+    results = _send(smtp_stub, ["busy@example.com"], pool_size=1)
+
+    assert results["busy@example.com"]["status"] == SENT
+    assert results["busy@example.com"]["attempts"] == 3
+    assert smtp_stub.delivered == ["busy@example.com"]
+
+
+def test_temporary_refusal_gives_up_after_max_attempts(smtp_stub):
+    smtp_stub.rcpt_codes["busy@example.com"] = [451] * 10
+    results = _send(smtp_stub, ["busy@example.com"], pool_size=1, max_attempts=2)
+
+    result = results["busy@example.com"]
+    assert result["status"] == FAILED
+    assert result["retryable"] is True
+    assert result["attempts"] == 2
+
+
+def test_permanent_refusal_fails_without_retry(smtp_stub):
+    smtp_stub.rcpt_codes["gone@example.com"] = [550]
+    results = _send(smtp_stub, ["gone@example.com", "ok@example.com"], pool_size=1)
+
+    assert results["gone@example.com"]["status"] == FAILED
+    assert results["gone@example.com"]["retryable"] is False
+    assert results["gone@example.com"]["attempts"] == 1
+    # The session survives a refused recipient and carries on
+    assert results["ok@example.com"]["status"] == SENT
+    assert smtp_stub.delivered == ["ok@example.com"]
+
+
+def test_unreachable_server_is_reported_as_retryable():
+    probe = _SMTPStub()
+    port = probe.server_address[1]
+    probe.server_close()
+    with Mailer("127.0.0.1", port, starttls=False, rate_limit=0, max_attempts=2) as m:
+        result = next(m.results([m.submit("a", _message("a@example.com"))]))
+    assert result["status"] == FAILED
+    assert result["retryable"] is True
+    assert result["attempts"] == 2
+
+
+@pytest.mark.parametrize("exc, retryable", [
+    (smtplib.SMTPServerDisconnected("gone"), True),
+    (smtplib.SMTPResponseException(421, b"try later"), True),
+    (smtplib.SMTPResponseException(554, b"rejected"), False),
+    (smtplib.SMTPRecipientsRefused({"a@example.com": (450, b"busy")}), True),
+    (smtplib.SMTPRecipientsRefused({"a@example.com": (450, b"busy"), "b@example.com": (550, b"no")}), False),
+    (smtplib.SMTPAuthenticationError(535, b"bad credentials"), False),
+    (smtplib.SMTPException("other"), False),
+    (ConnectionRefusedError(), True),
+    (TimeoutError(), True),
+    (ValueError("bug"), False),
+])
+def test_is_retryable(exc, retryable):
+    assert is_retryable(exc) is retryable
+
+
+def test_rate_limiter_spaces_calls():
+    limiter = _RateLimiter(20.0)
+    started = time.monotonic()
+    for _ in range(5):
+        limiter.wait()
+    # The first call goes straight through, the next four wait 50ms each
+    assert time.monotonic() - started >= 0.19
+
+
+def test_rate_limiter_disabled():
+    limiter = _RateLimiter(0)
+    started = time.monotonic()
+    for _ in range(100):
+        limiter.wait()
+    assert time.monotonic() - started < 0.1
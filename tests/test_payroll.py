@@ -0,0 +1,55 @@
+# Payroll upload checks
+import pandas as pd
+from pages.hr.payroll import REQUIRED_COLUMNS, ingest_payroll, missing_columns
+
+
+def _row(**overrides):
+    row = {
+        "employee_name": "Ada Obi", "employee_id": "E1",
+        "basic_pay": 100000, "Housing": 20000, "Transport": 10000, "other_allowances": 0,
+        "tax": 5000, "employee_pension": 8000, "other_deductions": 0,
+        "total_earnings": 130000, "total_deductions": 13000, "net_pay": 117000,
+        "email": "ada@example.com",
+    }
+    row.update(overrides)
+    return row
+
+
+def test_missing_columns():
+    assert missing_columns(pd.DataFrame(columns=REQUIRED_COLUMNS)) == []
+    assert missing_columns(pd.DataFrame(columns=["employee_name"]))[:2] == ["employee_id", "basic_pay"]
+
+
+def test_clean_rows_pass():
+    payroll, report = ingest_payroll(pd.DataFrame([_row(), _row(employee_id="E2", email="b@example.com")]))
+    assert report.empty
+    assert (payroll["issues"] == "").all()
+    assert payroll["computed_net_pay"].tolist() == [117000.0, 117000.0]
+
+
+def test_text_amounts_with_separators_and_blanks():
+    payroll, report = ingest_payroll(pd.DataFrame([
+        _row(basic_pay="100,000", other_allowances="", total_earnings=" 130,000 "),
+    ]).astype({"basic_pay": object, "other_allowances": object, "total_earnings": object}))
+    assert report.empty
+    assert payroll.loc[0, "basic_pay"] == 100000.0
+    assert payroll.loc[0, "other_allowances"] == 0.0
+
+
+def test_problems_are_reported_with_file_rows():
+    df = pd.DataFrame([
+        _row(),
+        _row(employee_id="E2", net_pay=120000),
+        _row(employee_id="E2", email="not-an-email"),
+        _row(employee_id="", basic_pay="abc"),
+    ]).astype({"basic_pay": object})
+    payroll, report = ingest_payroll(df)
+
+    assert report["row"].tolist() == [3, 4, 5]
+    issues = dict(zip(report["row"], report["issues"]))
+    assert "net_pay 120,000.00 ≠ 117,000.00" in issues[3]
+    assert "employee_id is duplicated" in issues[3]
+    assert "email is invalid" in issues[4]
+    assert "basic_pay is not a number" in issues[5]
+    assert "employee_id is blank" in issues[5]
+    assert payroll.loc[0, "issues"] == ""
@@ -0,0 +1,77 @@
+# Changed-row detection from per-row content hashes
+import pandas as pd
+from utils.row_hashes import changed_keys, diff_hashes, hash_rows
+from utils.schemas import ROW_ID
+from utils.writeback import ROW_COL, diff_cells, grid_changes
+
+
+def _trades():
+    return pd.DataFrame({
+        "Client": ["Ada", "Bola", "Chi"],
+        "Trade Size": [10.0, 20.0, 30.0],
+        ROW_ID: ["id-a", "id-b", "id-c"],
+    }, index=[2, 3, 4])
+
+
+def test_diff_hashes():
+    old = _trades()
+    new = old.drop(index=2)
+    new.loc[3, "Trade Size"] = 25.0
+    new.loc[5] = ["Dayo", 40.0, "id-d"]
+
+    changes = diff_hashes(hash_rows(old), hash_rows(new))
+    assert changes.inserted == {5}
+    assert changes.updated == {3}
+    assert changes.deleted == {2}
+    assert changed_keys(changes) == {2, 3, 5}
+
+
+def test_identical_frames_have_no_changes():
+    assert changed_keys(diff_hashes(hash_rows(_trades()), hash_rows(_trades()))) == set()
+
+
+def test_grid_edits_map_back_by_row_id_after_sorting():
+    page = _trades()
+    # The grid returns rows in its own order, as JSON-ish values
+    data = page.iloc[::-1].reset_index(drop=True).astype({"Trade Size": object})
+    data.loc[data[ROW_ID] == "id-b", "Trade Size"] = "22"
+
+    assert grid_changes(page, data).updated == {3}
+    assert diff_cells(page, data) == [(3, 2, "22")]
+
+
+def test_grid_edits_map_back_by_row_number_without_ids():
+    page = _trades().drop(columns=[ROW_ID])
+    data = page.reset_index(drop=True).assign(**{ROW_COL: page.index})
+    data.loc[2, "Client"] = "Chidi"
+
+    assert grid_changes(page, data).updated == {4}
+    assert diff_cells(page, data, rows={4}) == [(4, 1, "Chidi")]
+
+
+def test_grid_without_keys_reports_nothing():
+    page = _trades().drop(columns=[ROW_ID])
+    assert changed_keys(grid_changes(page, page.reset_index(drop=True))) == set()
+    assert diff_cells(page, page.reset_index(drop=True)) == []
+
+
+def test_blank_or_repeated_ids_fall_back_to_row_numbers():
+    page = _trades().assign(**{ROW_ID: ["id-a", "", ""]})
+    data = page.iloc[::-1].reset_index(drop=True).assign(**{ROW_COL: page.index[::-1]})
+    data = data.astype({"Trade Size": object})
+    data.loc[data[ROW_COL] == 3, "Trade Size"] = "22"
+
+    assert grid_changes(page, data).updated == {3}
+    assert diff_cells(page, data) == [(3, 2, "22")]
+
+
+def test_two_grid_rows_never_share_a_sheet_row():
+    page = _trades().assign(**{ROW_ID: ["id-a", "", ""]})
+    # Without row numbers the blank-ID rows can't be placed at all
+    data = page.iloc[::-1].reset_index(drop=True)
+    data.loc[0, "Client"] = "Chidi"
+    assert diff_cells(page, data) == []
+
+    data = page.reset_index(drop=True).assign(**{ROW_COL: [2, 3, 3]})
+    data.loc[1, "Client"] = "Chidi"
+    assert diff_cells(page, data) == []
@@ -0,0 +1,164 @@
+# Replica-backed tab loading against an in-memory stand-in for a spreadsheet
+from types import SimpleNamespace
+import pytest
+from gspread.utils import a1_range_to_grid_range, a1_to_rowcol
+from utils import replica, sheets, writeback
+
+SHEET_KEY = "test-sheet"
+TAB = "Trades"
+
+
+class FakeWorksheet:
+    def __init__(self, title, values):
+        self.title = title
+        self.values = values
+
+    def append_rows(self, rows, **kwargs):
+        start = len(self.values) + 1
+        self.values.extend([[str(v) for v in row] for row in rows])
+        return {"updates": {"updatedRange": f"'{self.title}'!A{start}:C{start + len(rows) - 1}"}}
+
+    def cell(self, row, col):
+        values = self.values[row - 1] if row <= len(self.values) else []
+        return SimpleNamespace(value=values[col - 1] if col <= len(values) else None)
+
+    def batch_update(self, data, **kwargs):
+        for update in data:
+            row, col = a1_to_rowcol(update["range"])
+            self.values[row - 1][col - 1] = str(update["values"][0][0])
+
+    def delete_rows(self, row):
+        del self.values[row - 1]
+
+
+class FakeSpreadsheet:
+    def __init__(self, *worksheets):
+        self.worksheets = {ws.title: ws for ws in worksheets}
+
+    def values_batch_get(self, ranges):
+        value_ranges = []
+        for rng in ranges:
+            tab, _, a1 = rng.partition("!")
+            values = self.worksheets[tab.strip("'")].values
+            if a1:
+                values = values[a1_range_to_grid_range(a1)["startRowIndex"]:]
+            value_ranges.append({"values": values})
+        return {"valueRanges": value_ranges}
+
+
+@pytest.fixture
+def worksheet(tmp_path, monkeypatch):
+    ws = FakeWorksheet(TAB, [["Date", "Trade Size", "Client"],
+                             ["2024-01-01", "10", "a"],
+                             ["2024-01-01", "20", "b"]])
+    spreadsheet = FakeSpreadsheet(ws)
+    monkeypatch.setattr(replica, "REPLICA_PATH", str(tmp_path / "replica.db"))
+    monkeypatch.setattr(sheets, "get_spreadsheet", lambda key: spreadsheet)
+    monkeypatch.setattr(sheets, "get_worksheet", lambda key, tab: ws)
+    monkeypatch.setattr(writeback, "get_worksheet", lambda key, tab: ws)
+    for registry in ("_frames", "_quarantine", "_hashes", "_row_ids", "_versions", "_dirty"):
+        monkeypatch.setattr(sheets, registry, {})
+    return ws
+
+
+def _append(ws, row):
+    sheets.record_append(SHEET_KEY, TAB, [row], ws.append_rows([row]))
+
+
+def test_append_is_mirrored_into_the_replica(worksheet):
+    sheets.load_tab(SHEET_KEY, TAB)
+    _append(worksheet, ["2024-01-02", "5", "c"])
+
+    assert replica.read_tab(SHEET_KEY, TAB)["Trade Size"].tolist() == [10, 20, 5]
+    assert sheets.load_tab(SHEET_KEY, TAB)["Trade Size"].tolist() == [10, 20, 5]
+
+
+def test_append_after_rows_added_in_sheets_resyncs(worksheet):
+    sheets.load_tab(SHEET_KEY, TAB)
+    # Someone adds a row directly in Google Sheets, then a form row is appended
+    worksheet.values.append(["2024-01-01", "27", "external"])
+    _append(worksheet, ["2024-01-01", "43", "ours"])
+
+    df = sheets.load_tab(SHEET_KEY, TAB)
+    assert df["Trade Size"].tolist() == [10, 20, 27, 43]
+    assert df.index.tolist() == [2, 3, 4, 5]
+
+
+def test_unreadable_append_response_resyncs(worksheet):
+    sheets.load_tab(SHEET_KEY, TAB)
+    worksheet.append_rows([["2024-01-03", "7", "d"]])
+    sheets.record_append(SHEET_KEY, TAB, [["2024-01-03", "7", "d"]], {})
+
+    assert sheets.load_tab(SHEET_KEY, TAB)["Trade Size"].tolist() == [10, 20, 7]
+
+
+def test_appended_first_row():
+    assert sheets._appended_first_row({"updates": {"updatedRange": "'USD Trade'!A105:K106"}}) == 105
+    assert sheets._appended_first_row({"updates": {}}) is None
+    assert sheets._appended_first_row(None) is None
+
+
+@pytest.fixture
+def with_ids(worksheet):
+    for row, row_id in zip(worksheet.values, ["_id", "id-a", "id-b"]):
+        row.append(row_id)
+    worksheet.values.append(["2024-01-02", "30", "c", "id-c"])
+    return worksheet
+
+
+def test_rows_are_found_by_id(with_ids):
+    assert sheets.find_row(SHEET_KEY, TAB, "id-b") == 3
+    assert sheets.find_row(SHEET_KEY, TAB, "id-z") is None
+
+    _append(with_ids, ["2024-01-03", "5", "d", "id-d"])
+    assert sheets.find_row(SHEET_KEY, TAB, "id-d") == 5
+
+
+def test_blank_and_repeated_ids_are_not_indexed(with_ids):
+    with_ids.values[2][3] = "id-a"
+    with_ids.values[3][3] = ""
+    assert sheets.find_row(SHEET_KEY, TAB, "id-a") is None
+    assert sheets._row_ids[(SHEET_KEY, TAB)] == {}
+
+
+def test_update_row_writes_only_that_row(with_ids):
+    assert writeback.update_row(SHEET_KEY, TAB, "id-b", {"Client": "Bola"}) == 3
+    assert with_ids.values[2] == ["2024-01-01", "20", "Bola", "id-b"]
+    assert sheets.load_tab(SHEET_KEY, TAB)["Client"].tolist() == ["a", "Bola", "c"]
+
+    with pytest.raises(KeyError):
+        writeback.update_row(SHEET_KEY, TAB, "id-b", {"Missing": 1})
+
+
+def test_delete_row_renumbers_the_rows_below(with_ids):
+    assert writeback.delete_row(SHEET_KEY, TAB, "id-a") == 2
+    assert sheets.load_tab(SHEET_KEY, TAB)["Client"].tolist() == ["b", "c"]
+    assert sheets.find_row(SHEET_KEY, TAB, "id-c") == 3
+    with pytest.raises(KeyError):
+        writeback.delete_row(SHEET_KEY, TAB, "id-a")
+
+
+def test_moved_row_is_refused(with_ids):
+    sheets.load_tab(SHEET_KEY, TAB)
+    # Deleted directly in Google Sheets since the last load
+    del with_ids.values[1]
+    with pytest.raises(KeyError):
+        writeback.update_row(SHEET_KEY, TAB, "id-b", {"Client": "Bola"})
+    assert with_ids.values[1][2] == "b"
+    assert sheets.find_row(SHEET_KEY, TAB, "id-b") == 2
+
+
+def test_failed_sync_serves_the_replica_and_drops_stale_handles(worksheet, monkeypatch):
+    sheets.load_tab(SHEET_KEY, TAB)
+    monkeypatch.setattr(sheets, "_spreadsheets", {SHEET_KEY: object()})
+    monkeypatch.setattr(sheets, "_worksheets", {(SHEET_KEY, TAB): worksheet, ("other", TAB): worksheet})
+
+    def unreachable(sheet_key):
+        raise ConnectionError("offline")
+
+    monkeypatch.setattr(sheets, "get_spreadsheet", unreachable)
+    sheets.invalidate_tab(SHEET_KEY, TAB)
+
+    assert sheets.load_tab(SHEET_KEY, TAB)["Trade Size"].tolist() == [10, 20]
+    assert sheets._spreadsheets == {}
+    assert list(sheets._worksheets) == [("other", TAB)]
@@ -0,0 +1,129 @@
+# Background write queue: what a flush reports for each outcome of the append
+import pytest
+import requests
+from utils import write_queue
+from utils.write_queue import COMMITTED, FAILED, PENDING
+
+TAB_KEY = ("test-sheet", "Trades")
+
+
+class FakeWorksheet:
+    def __init__(self, error=None):
+        self.error = error
+        self.rows = []
+
+    def append_rows(self, rows, **kwargs):
+        if self.error is not None:
+            raise self.error
+        self.rows.extend(rows)
+        return {"updates": {"updatedRange": f"Trades!A2:B{len(rows) + 1}"}}
+
+    def col_values(self, col):
+        return [row[col - 1] for row in self.rows if len(row) >= col]
+
+
+@pytest.fixture
+def queue(monkeypatch):
+    for registry in ("_queues", "_attempts", "_retry_at", "_entries"):
+        monkeypatch.setattr(write_queue, registry, {})
+    recorded = []
+    monkeypatch.setattr(write_queue, "record_append", lambda *args: recorded.append(args))
+    monkeypatch.setattr(write_queue, "invalidate_tab", lambda *args, **kwargs: None)
+    monkeypatch.setattr(write_queue, "row_id_column", lambda sheet_key, tab: None)
+    return recorded
+
+
+def _entries(*rows):
+    entries = [write_queue._Entry(f"key{i}", *TAB_KEY, row) for i, row in enumerate(rows)]
+    write_queue._queues[TAB_KEY] = list(entries)
+    for entry in entries:
+        write_queue._entries[entry.key] = entry
+    return entries
+
+
+def _use(monkeypatch, worksheet):
+    monkeypatch.setattr(write_queue, "get_worksheet", lambda sheet_key, tab: worksheet)
+
+
+def test_flush_commits_and_records_the_append(queue, monkeypatch):
+    worksheet = FakeWorksheet()
+    _use(monkeypatch, worksheet)
+    entries = _entries(["a", 1], ["b", 2])
+
+    write_queue._flush(TAB_KEY, entries)
+
+    assert worksheet.rows == [["a", 1], ["b", 2]]
+    assert [write_queue.get_status(e.key) for e in entries] == [(COMMITTED, None)] * 2
+    assert write_queue._queues[TAB_KEY] == []
+    assert len(queue) == 1
+
+
+def test_bookkeeping_failure_after_append_still_commits(queue, monkeypatch):
+    worksheet = FakeWorksheet()
+    _use(monkeypatch, worksheet)
+
+    def broken(*args):
+        raise RuntimeError("replica unavailable")
+
+    monkeypatch.setattr(write_queue, "record_append", broken)
+    entries = _entries(["a", 1])
+
+    write_queue._flush(TAB_KEY, entries)
+
+    assert worksheet.rows == [["a", 1]]
+    assert write_queue.get_status("key0") == (COMMITTED, None)
+
+
+def test_retryable_failure_stays_pending(queue, monkeypatch):
+    _use(monkeypatch, FakeWorksheet(requests.exceptions.ConnectionError("reset")))
+    entries = _entries(["a", 1])
+
+    write_queue._flush(TAB_KEY, entries)
+
+    assert write_queue.get_status("key0") == (PENDING, None)
+    assert write_queue._attempts[TAB_KEY] == 1
+    assert TAB_KEY in write_queue._retry_at
+    assert queue == []
+
+
+def test_permanent_failure_is_reported(queue, monkeypatch):
+    _use(monkeypatch, FakeWorksheet(ValueError("bad row")))
+    entries = _entries(["a", 1])
+
+    write_queue._flush(TAB_KEY, entries)
+
+    assert write_queue.get_status("key0") == (FAILED, "bad row")
+    assert write_queue._queues[TAB_KEY] == []
+
+
+def test_unknown_key_has_no_status(queue):
+    assert write_queue.get_status("missing") == (None, None)
+
+
+def test_retry_skips_rows_whose_id_landed(queue, monkeypatch):
+    # The first attempt timed out after Sheets had stored the row
+    worksheet = FakeWorksheet()
+    worksheet.rows = [["a", 1, "key0"]]
+    _use(monkeypatch, worksheet)
+    monkeypatch.setattr(write_queue, "row_id_column", lambda sheet_key, tab: 3)
+    entries = _entries(["a", 1, "key0"], ["b", 2, "key1"])
+    write_queue._attempts[TAB_KEY] = 1
+
+    write_queue._flush(TAB_KEY, entries)
+
+    assert worksheet.rows == [["a", 1, "key0"], ["b", 2, "key1"]]
+    assert [write_queue.get_status(e.key) for e in entries] == [(COMMITTED, None)] * 2
+
+
+def test_retry_without_ids_never_drops_an_identical_row(queue, monkeypatch):
+    # Two tickets with the same values are both real submissions
+    worksheet = FakeWorksheet()
+    worksheet.rows = [["a", 1]]
+    _use(monkeypatch, worksheet)
+    entries = _entries(["a", 1])
+    write_queue._attempts[TAB_KEY] = 1
+
+    write_queue._flush(TAB_KEY, entries)
+
+    assert worksheet.rows == [["a", 1], ["a", 1]]
+    assert write_queue.get_status("key0") == (COMMITTED, None)
@@ -0,0 +1,75 @@
+# Grid edits written back after the real AgGrid dtype round trip
+import json
+import pandas as pd
+from st_aggrid.AgGridReturn import AgGridReturn
+from st_aggrid.aggrid_utils import _parse_data_and_grid_options
+from utils.grid import _grid_frame
+from utils.schemas import apply_schema
+from utils.writeback import diff_cells, grid_changes
+
+
+def _swap_page():
+    raw = pd.DataFrame({
+        "Date": ["2024-01-01", "2024-01-02"],
+        "Client": ["Ada", "Bola"],
+        "Usd Received": ["100", "200"],
+        "Usd Status": ["Paid", "Pending"],
+    }, index=[2, 3])
+    page, _ = apply_schema("Swap Trade", raw)
+    return page
+
+
+def _round_trip(grid_df, edit):
+    """What ``grid_response["data"]`` holds after the browser applies ``edit(rows)``."""
+    data, _, frame_dtypes = _parse_data_and_grid_options(grid_df.copy(), None, {}, False, False)
+    rows = json.loads(data.to_json(orient="records"))
+    edit(rows)
+    nodes = [{"data": {**row, "::auto_unique_id::": str(i)}} for i, row in enumerate(rows)]
+    return AgGridReturn(grid_df, frame_dtypes=frame_dtypes)._create_dataframe_from_nodes(nodes)
+
+
+def _with_row_col(page):
+    grid_df = _grid_frame(page)
+    grid_df["_row"] = page.index
+    return grid_df
+
+
+def test_new_category_value_is_written():
+    page = _swap_page()
+    assert isinstance(page["Client"].dtype, pd.CategoricalDtype)
+
+    def rename(rows):
+        rows[0]["Client"] = "Chidi"
+
+    data = _round_trip(_with_row_col(page), rename)
+    assert grid_changes(page, data).updated == {2}
+    assert diff_cells(page, data) == [(2, 2, "Chidi")]
+
+
+def test_untouched_page_writes_nothing():
+    page = _swap_page()
+    data = _round_trip(_with_row_col(page), lambda rows: None)
+    assert diff_cells(page, data) == []
+
+
+def test_value_lost_in_conversion_never_blanks_a_cell():
+    page = _swap_page()
+    grid_df = _with_row_col(page)
+    # Sent as a category, an unknown value comes back as NaN
+    grid_df["Client"] = page["Client"]
+
+    def rename(rows):
+        rows[1]["Client"] = "Chidi"
+
+    data = _round_trip(grid_df, rename)
+    assert data["Client"].isna().tolist() == [False, True]
+    assert diff_cells(page, data) == []
+
+
+def test_grid_frame_leaves_the_page_alone():
+    page = _swap_page()
+    grid_df = _grid_frame(page)
+    _parse_data_and_grid_options(grid_df, None, {}, False, False)
+    assert pd.api.types.is_datetime64_any_dtype(page["Date"])
+    assert isinstance(page["Client"].dtype, pd.CategoricalDtype)
+    assert grid_df["Client"].dtype == object
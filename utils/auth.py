@@ -1,19 +1,52 @@
+import datetime
+import threading
 import gspread
 import streamlit as st
+from google.auth.transport.requests import Request
 from oauth2client.service_account import ServiceAccountCredentials
 
-def get_gspread_client():
-    scope = [
-        "https://spreadsheets.google.com/feeds",
-        "https://www.googleapis.com/auth/drive",
-        "https://www.googleapis.com/auth/spreadsheets"
-    ]
+SCOPE = [
+    "https://spreadsheets.google.com/feeds",
+    "https://www.googleapis.com/auth/drive",
+    "https://www.googleapis.com/auth/spreadsheets"
+]
+
+# Refresh the access token this long before Google expires it
+TOKEN_REFRESH_MARGIN = datetime.timedelta(minutes=5)
+
+# --- PROCESS-WIDE GSPREAD CLIENT ---
+_client = None
+_client_lock = threading.Lock()
 
+
+def _authorize():
     # ✅ Use secrets directly — no need for json.loads
     creds_dict = st.secrets["google_creds"]
-    creds = ServiceAccountCredentials.from_json_keyfile_dict(dict(creds_dict), scope)
-    client = gspread.authorize(creds)
-    return client
+    creds = ServiceAccountCredentials.from_json_keyfile_dict(dict(creds_dict), SCOPE)
+    return gspread.authorize(creds)
+
+
+def _token_expiring(creds):
+    expiry = getattr(creds, "expiry", None)
+    if not getattr(creds, "token", None) or expiry is None:
+        return True
+    # google-auth keeps expiry as a naive UTC datetime
+    return expiry - datetime.datetime.utcnow() < TOKEN_REFRESH_MARGIN
+
+
+def get_gspread_client():
+    """Return the shared, already-authorized client for this server process.
+
+    The client is built once; its token is refreshed ahead of expiry so a
+    request never has to wait on an OAuth exchange.
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = _authorize()
+        if _token_expiring(_client.auth):
+            _client.auth.refresh(Request())
+        return _client
 
 
 # --- USER CREDENTIALS ---
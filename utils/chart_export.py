@@ -0,0 +1,52 @@
+# On-demand Plotly chart image export through one long-lived Kaleido renderer
+import hashlib
+import threading
+import streamlit as st
+from kaleido.scopes.plotly import PlotlyScope
+
+FORMATS = {"png": "image/png", "svg": "image/svg+xml"}
+
+
+# Kaleido keeps its Chromium subprocess alive between transforms; one scope
+# serves the whole server, one export at a time.
+_scope = None
+_scope_lock = threading.Lock()
+
+
+def render_image(fig, fmt="png"):
+    """Render ``fig`` without Streamlit caching, so background jobs can call it."""
+    global _scope
+    with _scope_lock:
+        if _scope is None:
+            _scope = PlotlyScope()
+        return _scope.transform(fig, format=fmt)
+
+
+@st.cache_data(max_entries=64, show_spinner="Rendering chart…")
+def _render(digest, fmt, _fig):
+    return render_image(_fig, fmt)
+
+
+def figure_digest(fig):
+    return hashlib.sha1(fig.to_json().encode("utf-8")).hexdigest()
+
+
+def chart_image(fig, fmt="png"):
+    """Image bytes of ``fig``, rendered once per distinct figure content."""
+    return _render(figure_digest(fig), fmt, fig)
+
+
+def chart_download(fig, file_stem, label, key):
+    """Offer a chart download that only renders when the button is clicked."""
+    col_fmt, col_btn = st.columns([1, 4])
+    with col_fmt:
+        fmt = st.selectbox("Format", list(FORMATS), key=f"{key}_fmt", label_visibility="collapsed")
+    with col_btn:
+        # Reruns only redraw the button; Kaleido runs on click, once per figure
+        st.download_button(
+            label=f"📥 Download {label} ({fmt.upper()})",
+            data=lambda: chart_image(fig, fmt),
+            file_name=f"{file_stem}.{fmt}",
+            mime=FORMATS[fmt],
+            key=f"{key}_download",
+        )
@@ -1,34 +1,273 @@
-# Export utilities for Excel and PDF
+# Export utilities for Excel, CSV, Parquet and PDF
 import streamlit as st
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import xlsxwriter
 from fpdf import FPDF
-import os
+import io
+import tempfile
 
+# Exports stay in memory up to this size, then spill to a private temp file
+SPOOL_MAX_SIZE = 32 * 1024 * 1024
 
-def export_to_excel(df, filename="export.xlsx"):
-    path = os.path.join("data", filename)
-    df.to_excel(path, index=False)
-    return path
+# --- PDF TABLES ---
+FONT_SIZE = 8
+ROW_HEIGHT = 6
+CELL_PADDING = 1.5
+# Rows measured to size the columns, and rows formatted at a time
+WIDTH_SAMPLE = 500
+CHUNK_ROWS = 5000
+
+
+def _format_cells(chunk):
+    """Render a slice of the frame as display strings, column by column."""
+    cells = {}
+    for col in chunk.columns:
+        series = chunk[col]
+        if pd.api.types.is_datetime64_any_dtype(series):
+            dates = series.dropna()
+            fmt = "%Y-%m-%d" if (dates == dates.dt.normalize()).all() else "%Y-%m-%d %H:%M"
+            text = series.dt.strftime(fmt)
+        elif pd.api.types.is_float_dtype(series):
+            text = series.map("{:,.2f}".format)
+        else:
+            text = series.astype(str)
+        text = text.where(series.notna(), "").astype(str)
+        # The core fonts only cover Latin-1 (₦ and friends become "?")
+        cells[col] = text.str.encode("latin-1", "replace").str.decode("latin-1")
+    return pd.DataFrame(cells, index=chunk.index)
+
+
+def _column_widths(pdf, df, headers):
+    """Widths from the header and a sample of rows; also returns average character widths."""
+    sample = df.sample(n=WIDTH_SAMPLE, random_state=0) if len(df) > WIDTH_SAMPLE else df
+    cells = _format_cells(sample)
+    widths, char_widths = [], []
+    for col, header in zip(df.columns, headers):
+        texts = cells[col].tolist()
+        measured = [pdf.get_string_width(text) for text in texts]
+        header = pdf.get_string_width(header)
+        # A handful of very long values shouldn't stretch the whole column
+        body = pd.Series(measured, dtype="float64").quantile(0.95) if measured else 0.0
+        widths.append(max(header, body) + 2 * CELL_PADDING)
+        chars = sum(len(text) for text in texts)
+        char_widths.append(sum(measured) / chars if chars else pdf.get_string_width("0"))
+    return widths, char_widths
+
+
+def _fit(cells, max_chars):
+    for col, limit in zip(cells.columns, max_chars):
+        text = cells[col]
+        long = text.str.len() > limit
+        if long.any():
+            cells[col] = text.where(~long, text.str.slice(0, max(limit - 3, 1)) + "...")
+    return cells
+
+
+class _TableWriter:
+    """Writes a table page by page, placing text directly and ruling each page once."""
+
+    def __init__(self, pdf, headers, widths):
+        self.pdf = pdf
+        self.headers = headers
+        self.widths = widths
+        self.xs = [pdf.l_margin + sum(widths[:i]) for i in range(len(widths))]
+        self.right = pdf.l_margin + sum(widths)
+        self.rows_per_page = int((pdf.h - pdf.t_margin - pdf.b_margin) // ROW_HEIGHT) - 1
+        self.rows_on_page = None
+        self.y = None
+
+    def _baseline(self, top):
+        return top + (ROW_HEIGHT + self.pdf.font_size * 0.7) / 2
+
+    def _start_page(self):
+        pdf = self.pdf
+        pdf.add_page()
+        self.top = self.y = pdf.t_margin
+        pdf.set_fill_color(230, 230, 230)
+        pdf.rect(pdf.l_margin, self.y, self.right - pdf.l_margin, ROW_HEIGHT, style="F")
+        pdf.set_font("Arial", style="B", size=FONT_SIZE)
+        for x, header in zip(self.xs, self.headers):
+            pdf.text(x + CELL_PADDING, self._baseline(self.y), header)
+        pdf.set_font("Arial", size=FONT_SIZE)
+        self.y += ROW_HEIGHT
+        self.rows_on_page = 0
+
+    def _finish_page(self):
+        pdf = self.pdf
+        for i in range(self.rows_on_page + 2):
+            y = self.top + i * ROW_HEIGHT
+            pdf.line(pdf.l_margin, y, self.right, y)
+        for x in self.xs + [self.right]:
+            pdf.line(x, self.top, x, self.y)
+
+    def write_rows(self, rows):
+        text, pad = self.pdf.text, CELL_PADDING
+        for row in rows:
+            if self.rows_on_page is None or self.rows_on_page == self.rows_per_page:
+                if self.rows_on_page is not None:
+                    self._finish_page()
+                self._start_page()
+            baseline = self._baseline(self.y)
+            for x, value in zip(self.xs, row):
+                if value:
+                    text(x + pad, baseline, value)
+            self.y += ROW_HEIGHT
+            self.rows_on_page += 1
+
+    def close(self):
+        if self.rows_on_page is None:
+            self._start_page()
+        self._finish_page()
+
+
+def _write_pdf(df, out):
+    """Write ``df`` to ``out`` as a paginated table PDF.
+
+    Columns are sized from the header and a sample of rows (landscape when
+    they don't fit portrait), overlong values are cut short, and the header
+    repeats on every page. Rows are formatted a chunk at a time and written
+    with a plain row iterator, so large histories don't need a second copy
+    of the whole frame as strings.
+    """
+    headers = [str(col).encode("latin-1", "replace").decode("latin-1") for col in df.columns]
 
-def export_to_pdf(df, filename="export.pdf"):
-    path = os.path.join("data", filename)
     pdf = FPDF()
-    pdf.add_page()
-    pdf.set_font("Arial", size=10)
+    pdf.set_font("Arial", style="B", size=FONT_SIZE)
+    widths, char_widths = _column_widths(pdf, df, headers)
+    if sum(widths) > pdf.epw:
+        pdf = FPDF(orientation="L")
+        pdf.set_font("Arial", size=FONT_SIZE)
+    pdf.set_auto_page_break(False)
+    if sum(widths) > pdf.epw:
+        scale = pdf.epw / sum(widths)
+        widths = [w * scale for w in widths]
+    # Slightly conservative so cut values stay inside their cell
+    max_chars = [max(int((w - 2 * CELL_PADDING) / (cw * 1.1)), 1) for w, cw in zip(widths, char_widths)]
+
+    writer = _TableWriter(pdf, headers, widths)
+    for start in range(0, len(df), CHUNK_ROWS):
+        cells = _fit(_format_cells(df.iloc[start:start + CHUNK_ROWS]), max_chars)
+        writer.write_rows(cells.itertuples(index=False, name=None))
+    writer.close()
+    out.write(pdf.output())
+
+
+# --- EXPORTS ---
+def _sheet_name(name):
+    # Excel caps sheet names at 31 characters and bans a few of them
+    for ch in "[]:*?/\\":
+        name = name.replace(ch, "_")
+    return name[:31] or "Sheet1"
+
+
+def _excel_columns(chunk):
+    # Plain Python values per column; blanks become None so they're skipped
+    columns = []
+    for col in chunk.columns:
+        series = chunk[col]
+        if isinstance(series.dtype, pd.DatetimeTZDtype):
+            series = series.dt.tz_localize(None)
+        columns.append(series.astype(object).where(series.notna(), None).tolist())
+    return columns
+
+
+def _write_xlsx(sheets, out):
+    # constant_memory flushes each row as it is written, so only the current
+    # row is held by xlsxwriter; rows must go out strictly in order
+    workbook = xlsxwriter.Workbook(out, {
+        "constant_memory": True,
+        "default_date_format": "yyyy-mm-dd",
+        "nan_inf_to_errors": True,
+        "strings_to_urls": False,
+    })
+    bold = workbook.add_format({"bold": True})
+    for name, df in sheets.items():
+        worksheet = workbook.add_worksheet(_sheet_name(str(name)))
+        worksheet.write_row(0, 0, [str(col) for col in df.columns], bold)
+        row = 1
+        for start in range(0, len(df), CHUNK_ROWS):
+            for values in zip(*_excel_columns(df.iloc[start:start + CHUNK_ROWS])):
+                worksheet.write_row(row, 0, values)
+                row += 1
+    workbook.close()
+
+
+def _write_csv(df, out):
+    text = io.TextIOWrapper(out, encoding="utf-8", newline="")
+    for start in range(0, max(len(df), 1), CHUNK_ROWS):
+        df.iloc[start:start + CHUNK_ROWS].to_csv(text, index=False, header=start == 0)
+    text.flush()
+    text.detach()
+
+
+def _write_parquet(df, out):
+    df = df.reset_index(drop=True)
+    # Untyped sheet columns can mix numbers and text, which Arrow rejects
+    for col in df.columns[df.dtypes == object]:
+        df[col] = df[col].astype(str).where(df[col].notna(), None)
+    schema = pa.Schema.from_pandas(df, preserve_index=False)
+    with pq.ParquetWriter(out, schema, compression="snappy") as writer:
+        for start in range(0, max(len(df), 1), CHUNK_ROWS):
+            chunk = df.iloc[start:start + CHUNK_ROWS]
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+
+
+# format -> (mime type, writer(data, out)); only xlsx takes several sheets
+EXPORT_FORMATS = {
+    "xlsx": ("application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", _write_xlsx),
+    "csv": ("text/csv", _write_csv),
+    "parquet": ("application/vnd.apache.parquet", _write_parquet),
+    "pdf": ("application/pdf", _write_pdf),
+}
+
+
+def export_buffer(data, fmt="xlsx"):
+    """Export ``data`` into a fresh spooled buffer, positioned at the start.
+
+    ``data`` is a DataFrame, or for xlsx a ``{sheet name: DataFrame}`` dict.
+    Each call gets its own buffer, so concurrent sessions never share a file.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format: {fmt}")
+    if isinstance(data, dict) and fmt != "xlsx":
+        raise ValueError(f"{fmt} exports take a single table, not {len(data)} sheets")
+    if fmt == "xlsx" and not isinstance(data, dict):
+        data = {"Sheet1": data}
+    out = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    EXPORT_FORMATS[fmt][1](data, out)
+    out.seek(0)
+    return out
+
 
-    col_width = pdf.w / (len(df.columns) + 1)
-    row_height = 10
+def export_bytes(data, fmt="xlsx"):
+    """The contents of :func:`export_buffer` as bytes, ready for a download."""
+    with export_buffer(data, fmt) as out:
+        return out.read()
 
-    # Header
-    for col in df.columns:
-        pdf.cell(col_width, row_height, str(col), border=1)
-    pdf.ln(row_height)
 
-    # Rows
-    for i in range(len(df)):
-        for col in df.columns:
-            pdf.cell(col_width, row_height, str(df.iloc[i][col]), border=1)
-        pdf.ln(row_height)
+def export_download(data, file_stem, label, key, formats=None):
+    """Download button for ``data`` with a format picker.
 
-    pdf.output(path)
-    return path
+    Sheet dicts can only go out as xlsx; single tables offer every format.
+    The export is only built when the button is clicked, so large histories
+    aren't re-exported on every rerun.
+    """
+    if formats is None:
+        formats = ["xlsx"] if isinstance(data, dict) else ["xlsx", "csv", "parquet", "pdf"]
+    fmt = formats[0]
+    if len(formats) > 1:
+        col_fmt, container = st.columns([1, 4])
+        with col_fmt:
+            fmt = st.selectbox("Format", formats, key=f"{key}_fmt", label_visibility="collapsed")
+    else:
+        container = st.container()
+    with container:
+        st.download_button(
+            label=f"📥 Download {label} ({fmt.upper()})",
+            data=lambda: export_bytes(data, fmt),
+            file_name=f"{file_stem}.{fmt}",
+            mime=EXPORT_FORMATS[fmt][0],
+            key=f"{key}_download",
+        )
@@ -0,0 +1,174 @@
+# Server-side paged AgGrid: filter, sort and slice in pandas, send one page
+import copy
+import math
+import re
+import pandas as pd
+import streamlit as st
+from st_aggrid import AgGrid, GridOptionsBuilder, GridUpdateMode
+from utils.schemas import ROW_ID
+from utils.writeback import ROW_COL
+
+PAGE_SIZES = (25, 50, 100, 250)
+DEFAULT_PAGE_SIZE = 50
+
+_NO_FILTER = "(no filter)"
+_NO_SORT = "(sheet order)"
+_COMPARISON = re.compile(r"^\s*(<=|>=|<|>|=|!=)?\s*(.+?)\s*$")
+_RANGE = re.compile(r"^\s*(.+?)\s*\.\.\s*(.+?)\s*$")
+
+
+@st.cache_resource(show_spinner=False, max_entries=64)
+def _grid_options(schema, editable, hidden, _frame):
+    # Keyed on (column, dtype) pairs, so reruns and new rows reuse the options;
+    # sorting and filtering happen server-side, so the grid doesn't offer them
+    gb = GridOptionsBuilder.from_dataframe(_frame)
+    gb.configure_default_column(editable=editable, filter=False, sortable=False, resizable=True)
+    for col in hidden:
+        gb.configure_column(col, hide=True, editable=False)
+    return gb.build()
+
+
+def grid_options(df, editable=True, hidden=()):
+    """AgGrid options for frames shaped like ``df``, built once per schema."""
+    schema = tuple((str(col), str(dtype)) for col, dtype in df.dtypes.items())
+    # AgGrid fills in the options it is given; keep the cached copy pristine
+    return copy.deepcopy(_grid_options(schema, editable, tuple(hidden), df.head(0)))
+
+
+def _compare(values, op, operand):
+    if op == "<":
+        return values < operand
+    if op == "<=":
+        return values <= operand
+    if op == ">":
+        return values > operand
+    if op == ">=":
+        return values >= operand
+    if op == "!=":
+        return values != operand
+    return values == operand
+
+
+def filter_frame(df, col, query):
+    """Rows of ``df`` whose ``col`` matches ``query``.
+
+    Numeric and date columns take ``>100``, ``<=2024-01-31``, ``=5`` or a
+    range like ``100..200``; anything else is a case-insensitive substring
+    match. Queries that don't parse for the column's type match nothing.
+    """
+    query = query.strip()
+    if not query or col not in df.columns:
+        return df
+    values = df[col]
+    if pd.api.types.is_datetime64_any_dtype(values):
+        parse = lambda text: pd.to_datetime(text, errors="coerce")
+    elif pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+        parse = lambda text: pd.to_numeric(text.replace(",", ""), errors="coerce")
+    else:
+        return df[values.astype(str).str.contains(query, case=False, regex=False, na=False)]
+
+    bounds = _RANGE.match(query)
+    if bounds:
+        low, high = parse(bounds.group(1)), parse(bounds.group(2))
+        if pd.isna(low) or pd.isna(high):
+            return df.iloc[0:0]
+        return df[values.between(low, high)]
+    op, text = _COMPARISON.match(query).groups()
+    operand = parse(text)
+    if pd.isna(operand):
+        return df.iloc[0:0]
+    if op is None and pd.api.types.is_datetime64_any_dtype(values):
+        # A bare date means that whole day
+        return df[values.dt.normalize() == operand.normalize()]
+    return df[_compare(values, op, operand)]
+
+
+def sort_frame(df, col, ascending=True):
+    if col not in df.columns:
+        return df
+    return df.sort_values(col, ascending=ascending, kind="stable", na_position="last")
+
+
+def _grid_frame(page):
+    """The copy of ``page`` that goes to AgGrid.
+
+    AgGrid casts returned columns back to the dtypes it was sent, and a
+    category column can't hold a value typed into the grid (it comes back
+    as NaN), so categoricals go out as plain objects. AgGrid also rewrites
+    date columns in place, hence the copy.
+    """
+    grid_df = page.copy()
+    for col in grid_df.columns[[isinstance(dtype, pd.CategoricalDtype) for dtype in grid_df.dtypes]]:
+        grid_df[col] = grid_df[col].astype(object)
+    return grid_df
+
+
+def paged_grid(df, key, editable=True, row_numbers=True, height=400,
+               update_mode=GridUpdateMode.VALUE_CHANGED):
+    """Show ``df`` a page at a time; returns ``(page, grid_response)``.
+
+    Filtering, sorting and paging run here against the loaded frame and only
+    the visible page goes to the browser. ``page`` is the slice that was
+    sent (still indexed by sheet row), so grid edits can be diffed against it
+    with ``save_grid_edits``. With ``row_numbers`` each row also carries its
+    sheet row in a hidden ROW_COL, next to the hidden ROW_ID when the tab
+    has one.
+    """
+    columns = [str(col) for col in df.columns if col != ROW_ID]
+    c_filter_col, c_filter, c_sort_col, c_sort_dir = st.columns([2, 3, 2, 1])
+    with c_filter_col:
+        filter_col = st.selectbox("Filter column", [_NO_FILTER] + columns, key=f"{key}_filter_col")
+    with c_filter:
+        query = st.text_input("Filter", key=f"{key}_filter",
+                              placeholder="text, >100, <=2024-01-31 or 100..200",
+                              disabled=filter_col == _NO_FILTER)
+    with c_sort_col:
+        sort_col = st.selectbox("Sort by", [_NO_SORT] + columns, key=f"{key}_sort_col")
+    with c_sort_dir:
+        descending = st.toggle("Desc", key=f"{key}_sort_desc", disabled=sort_col == _NO_SORT)
+
+    view = df
+    if filter_col != _NO_FILTER:
+        view = filter_frame(view, filter_col, query)
+    if sort_col != _NO_SORT:
+        view = sort_frame(view, sort_col, ascending=not descending)
+
+    # Back to the first page whenever the filter or sort changes
+    signature = (filter_col, query, sort_col, descending)
+    if st.session_state.get(f"{key}_signature") != signature:
+        st.session_state[f"{key}_signature"] = signature
+        st.session_state[f"{key}_page"] = 1
+
+    c_info, c_size, c_page = st.columns([4, 1, 1])
+    with c_size:
+        page_size = st.selectbox("Rows per page", PAGE_SIZES, index=PAGE_SIZES.index(DEFAULT_PAGE_SIZE),
+                                 key=f"{key}_page_size")
+    pages = max(1, math.ceil(len(view) / page_size))
+    if st.session_state.get(f"{key}_page", 1) > pages:
+        st.session_state[f"{key}_page"] = pages
+    with c_page:
+        page_number = st.number_input("Page", min_value=1, max_value=pages, step=1, key=f"{key}_page")
+    start = (page_number - 1) * page_size
+    page = view.iloc[start:start + page_size]
+    with c_info:
+        shown = f"{start + 1:,}–{start + len(page):,}" if len(page) else "0"
+        st.caption(f"Showing {shown} of {len(view):,} rows"
+                   + (f" (filtered from {len(df):,})" if len(view) != len(df) else ""))
+
+    hidden = [ROW_ID] if ROW_ID in page.columns else []
+    grid_df = _grid_frame(page)
+    if row_numbers:
+        # Also sent with IDs: rows whose ID is blank or repeated fall back to it
+        grid_df[ROW_COL] = page.index
+        hidden.append(ROW_COL)
+    grid_response = AgGrid(
+        grid_df,
+        gridOptions=grid_options(grid_df, editable=editable, hidden=hidden),
+        update_mode=update_mode,
+        fit_columns_on_grid_load=True,
+        height=height,
+        # Each page is its own grid instance: the browser keeps edits made
+        # on a page, but never shows one page's rows under another's key
+        key=f"{key}_grid_{hash(signature)}_{page_size}_{page_number}",
+    )
+    return page, grid_response
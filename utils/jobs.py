@@ -0,0 +1,129 @@
+# Background jobs that build downloadable artefacts off the Streamlit script thread
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+import streamlit as st
+
+MAX_WORKERS = 2
+# Finished jobs kept for download, oldest dropped first
+JOB_HISTORY = 20
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+log = logging.getLogger(__name__)
+
+
+class Job:
+    def __init__(self, job_id, title):
+        self.job_id = job_id
+        self.title = title
+        self.status = QUEUED
+        self.progress = 0.0
+        self.message = "Waiting to start…"
+        self.error = None
+        # (file_name, mime, bytes) once the job is done
+        self.artefact = None
+        self.created_at = time.time()
+
+
+# --- JOB STATE ---
+_lock = threading.Lock()
+_jobs = {}   # job id -> Job, in submission order
+_executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="report-jobs")
+
+
+def _run(job, fn, args):
+    def progress(fraction, message):
+        with _lock:
+            job.progress = max(0.0, min(1.0, fraction))
+            job.message = message
+
+    with _lock:
+        job.status = RUNNING
+    try:
+        artefact = fn(progress, *args)
+    except Exception as exc:
+        log.error("Job %s (%s) failed", job.job_id, job.title, exc_info=True)
+        with _lock:
+            job.status = FAILED
+            job.error = str(exc)
+        return
+    with _lock:
+        job.artefact = artefact
+        job.progress = 1.0
+        job.message = "Ready"
+        job.status = DONE
+
+
+def submit_job(title, fn, *args):
+    """Run ``fn(progress, *args)`` in the background and return the job ID.
+
+    ``fn`` reports through ``progress(fraction, message)`` and returns the
+    artefact as ``(file_name, mime, bytes)``.
+    """
+    job = Job(uuid.uuid4().hex[:12], title)
+    with _lock:
+        _jobs[job.job_id] = job
+        finished = [j for j in _jobs.values() if j.status in (DONE, FAILED)]
+        for old in finished[:max(0, len(finished) - JOB_HISTORY)]:
+            del _jobs[old.job_id]
+    _executor.submit(_run, job, fn, args)
+    return job.job_id
+
+
+def get_job(job_id):
+    with _lock:
+        return _jobs.get(job_id)
+
+
+# --- UI ---
+def start_job(title, fn, *args):
+    """Submit a job and remember its ID for this session's job panel."""
+    job_id = submit_job(title, fn, *args)
+    st.session_state.setdefault("job_ids", []).append(job_id)
+    return job_id
+
+
+def _session_jobs():
+    jobs = [get_job(job_id) for job_id in reversed(st.session_state.get("job_ids", []))]
+    return [job for job in jobs if job is not None]
+
+
+def _active(jobs):
+    with _lock:
+        return any(job.status in (QUEUED, RUNNING) for job in jobs)
+
+
+def _jobs_panel(polling):
+    jobs = _session_jobs()
+    for job in jobs:
+        with _lock:
+            status, progress, message = job.status, job.progress, job.message
+            error, artefact = job.error, job.artefact
+        label = f"{job.title} · job {job.job_id}"
+        if status in (QUEUED, RUNNING):
+            st.progress(progress, text=f"⏳ {label}: {message}")
+        elif status == FAILED:
+            st.error(f"❌ {label} failed: {error}")
+        else:
+            file_name, mime, data = artefact
+            st.download_button(f"📦 Download {label}", data=data, file_name=file_name,
+                               mime=mime, key=f"job_{job.job_id}")
+    if polling and not _active(jobs):
+        # Every job has finished: rerun so the panel stops polling
+        st.rerun()
+
+
+def render_jobs():
+    """This session's jobs, with progress bars and download buttons.
+
+    The panel only polls (every 2 seconds) while one of the session's jobs
+    is queued or running.
+    """
+    polling = _active(_session_jobs())
+    st.fragment(_jobs_panel, run_every=2 if polling else None)(polling)
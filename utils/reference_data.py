@@ -0,0 +1,52 @@
+# Shared lookup lists for dropdowns (clients, sellers, transaction types, banks)
+import threading
+from utils.sheets import BANK_SHEET_KEY, DATABASE_SHEET_KEY, load_tab, tab_version
+
+CLIENT_TAB = "Client List"
+SELLER_TAB = "Seller List"
+TXN_TYPE_TAB = "Transaction type"
+BANK_TAB = "List of A/C"
+
+_lookups = {}   # (sheet_key, tab, column) -> (version, [values])
+_lock = threading.Lock()
+
+
+def get_lookup(sheet_key, tab, column=None):
+    """Distinct non-blank values of ``column`` (default: first column) of a tab.
+
+    Lists are built once per tab version and then served from memory; an
+    add or edit in the Database page bumps the version and rebuilds them.
+    """
+    frame = load_tab(sheet_key, tab, copy=False)
+    version = tab_version(sheet_key, tab)
+    key = (sheet_key, tab, column)
+    with _lock:
+        cached = _lookups.get(key)
+        if cached is not None and cached[0] == version:
+            return list(cached[1])
+
+    if frame.empty or (column is not None and column not in frame.columns):
+        values = []
+    else:
+        series = frame[column] if column is not None else frame.iloc[:, 0]
+        values = list(dict.fromkeys(v for v in series.dropna().tolist() if str(v).strip()))
+
+    with _lock:
+        _lookups[key] = (version, values)
+    return list(values)
+
+
+def get_clients():
+    return get_lookup(DATABASE_SHEET_KEY, CLIENT_TAB)
+
+
+def get_sellers():
+    return get_lookup(DATABASE_SHEET_KEY, SELLER_TAB)
+
+
+def get_transaction_types():
+    return get_lookup(DATABASE_SHEET_KEY, TXN_TYPE_TAB)
+
+
+def get_bank_details():
+    return get_lookup(BANK_SHEET_KEY, BANK_TAB, "Bank Details")
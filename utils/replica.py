@@ -0,0 +1,221 @@
+# Local SQLite replica of the Google Sheets tabs
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing
+import pandas as pd
+from gspread.utils import absolute_range_name, numericise_all, rowcol_to_a1
+
+REPLICA_PATH = os.path.join("data", "sheets_replica.db")
+
+# Appended rows are pulled on every sync; the whole tab is re-read and
+# checksummed this often so edits made directly in Google Sheets show up.
+FULL_SYNC_INTERVAL = 15 * 60
+
+log = logging.getLogger(__name__)
+_lock = threading.Lock()
+
+
+def records_frame(values):
+    """Build a DataFrame from raw cell values the way get_all_records() does."""
+    if not values:
+        return pd.DataFrame()
+    header = [str(col) for col in values[0]]
+    width = len(header)
+    rows = [numericise_all(list(row[:width]) + [""] * (width - len(row))) for row in values[1:]]
+    # Index rows by their sheet row number (row 1 is the header)
+    return pd.DataFrame(rows, columns=header, index=range(2, len(rows) + 2))
+
+
+# --- STORAGE ---
+def _connect():
+    os.makedirs(os.path.dirname(REPLICA_PATH), exist_ok=True)
+    conn = sqlite3.connect(REPLICA_PATH, timeout=30)
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS replica_meta ("
+        " sheet_key TEXT, tab TEXT, table_name TEXT, header TEXT,"
+        " row_count INTEGER, checksum TEXT, last_sync REAL, last_full_sync REAL,"
+        " PRIMARY KEY (sheet_key, tab))"
+    )
+    return conn
+
+
+def _table_name(sheet_key, tab):
+    return "tab_" + hashlib.sha1(f"{sheet_key}/{tab}".encode("utf-8")).hexdigest()[:16]
+
+
+def _checksum(values):
+    return hashlib.sha1(json.dumps(values, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def _get_meta(conn, sheet_key, tab):
+    row = conn.execute(
+        "SELECT table_name, header, row_count, checksum, last_sync, last_full_sync"
+        " FROM replica_meta WHERE sheet_key = ? AND tab = ?",
+        (sheet_key, tab),
+    ).fetchone()
+    if row is None:
+        return None
+    return {
+        "table_name": row[0],
+        "header": json.loads(row[1]),
+        "row_count": row[2],
+        "checksum": row[3],
+        "last_sync": row[4],
+        "last_full_sync": row[5],
+    }
+
+
+def _put_meta(conn, sheet_key, tab, header, row_count, checksum, last_sync, last_full_sync):
+    conn.execute(
+        "INSERT OR REPLACE INTO replica_meta VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        (sheet_key, tab, _table_name(sheet_key, tab), json.dumps(header),
+         row_count, checksum, last_sync, last_full_sync),
+    )
+
+
+def _read_rows(conn, table_name):
+    cursor = conn.execute(f'SELECT cells FROM "{table_name}" ORDER BY row_num')
+    return [json.loads(cells) for (cells,) in cursor]
+
+
+def _replace(conn, sheet_key, tab, values, now):
+    table_name = _table_name(sheet_key, tab)
+    header, rows = (values[0], values[1:]) if values else ([], [])
+    checksum = _checksum(values)
+    meta = _get_meta(conn, sheet_key, tab)
+    local_checksum = meta and meta["checksum"]
+    if meta is not None and local_checksum is None:
+        local_checksum = _checksum([meta["header"]] + _read_rows(conn, meta["table_name"]))
+    changed = local_checksum != checksum
+    if changed:
+        conn.execute(f'CREATE TABLE IF NOT EXISTS "{table_name}" (row_num INTEGER PRIMARY KEY, cells TEXT)')
+        conn.execute(f'DELETE FROM "{table_name}"')
+        conn.executemany(
+            f'INSERT INTO "{table_name}" VALUES (?, ?)',
+            ((i + 2, json.dumps(row, ensure_ascii=False)) for i, row in enumerate(rows)),
+        )
+    _put_meta(conn, sheet_key, tab, header, len(rows), checksum, now, now)
+    return changed
+
+
+def _append(conn, sheet_key, tab, meta, values, now):
+    start = meta["row_count"] + 2
+    conn.executemany(
+        f'INSERT OR REPLACE INTO "{meta["table_name"]}" VALUES (?, ?)',
+        ((start + i, json.dumps(row, ensure_ascii=False)) for i, row in enumerate(values)),
+    )
+    # The stored checksum no longer describes the local copy; the next full
+    # pass recomputes it from disk before deciding whether to rewrite.
+    checksum = None if values else meta["checksum"]
+    _put_meta(conn, sheet_key, tab, meta["header"], meta["row_count"] + len(values),
+              checksum, now, meta["last_full_sync"])
+    return bool(values)
+
+
+# --- SYNC ---
+def sync_sheet(spreadsheet, sheet_key, tabs):
+    """Bring the local copies of ``tabs`` up to date in one values_batch_get.
+
+    Tabs seen for the first time, or whose full pass is due, are fetched in
+    full; the rest only fetch the rows below what is already stored. Returns
+    ``{tab: rows}`` for tabs whose local copy changed, where ``rows`` holds the
+    appended sheet row numbers, or None when the tab was rewritten in full.
+    """
+    with _lock, closing(_connect()) as conn:
+        now = time.time()
+        plan = []
+        for tab in tabs:
+            meta = _get_meta(conn, sheet_key, tab)
+            if meta is None or not meta["header"] or now - meta["last_full_sync"] >= FULL_SYNC_INTERVAL:
+                plan.append((tab, None, absolute_range_name(tab)))
+            else:
+                first_row = meta["row_count"] + 2
+                last_col = rowcol_to_a1(1, len(meta["header"])).rstrip("0123456789")
+                plan.append((tab, meta, absolute_range_name(tab, f"A{first_row}:{last_col}")))
+
+        response = spreadsheet.values_batch_get([rng for _, _, rng in plan])
+        changed = {}
+        for (tab, meta, _), value_range in zip(plan, response.get("valueRanges", [])):
+            values = value_range.get("values", [])
+            if meta is None:
+                if _replace(conn, sheet_key, tab, values, now):
+                    changed[tab] = None
+            elif _append(conn, sheet_key, tab, meta, values, now):
+                start = meta["row_count"] + 2
+                changed[tab] = set(range(start, start + len(values)))
+        conn.commit()
+        return changed
+
+
+def request_full_sync(sheet_key, tab):
+    """Make the next sync re-read ``tab`` in full."""
+    with _lock, closing(_connect()) as conn:
+        conn.execute("UPDATE replica_meta SET last_full_sync = 0 WHERE sheet_key = ? AND tab = ?",
+                     (sheet_key, tab))
+        conn.commit()
+
+
+def update_cells(sheet_key, tab, cells):
+    """Patch ``[(sheet_row, sheet_col, value)]`` written to the sheet into the local copy."""
+    by_row = {}
+    for row, col, value in cells:
+        by_row.setdefault(row, []).append((col, value))
+    with _lock, closing(_connect()) as conn:
+        meta = _get_meta(conn, sheet_key, tab)
+        if meta is None:
+            return
+        table_name = meta["table_name"]
+        for row, updates in by_row.items():
+            found = conn.execute(f'SELECT cells FROM "{table_name}" WHERE row_num = ?', (row,)).fetchone()
+            if found is None:
+                continue
+            cells_row = json.loads(found[0])
+            for col, value in updates:
+                cells_row.extend([""] * (col - len(cells_row)))
+                cells_row[col - 1] = str(value)
+            conn.execute(f'UPDATE "{table_name}" SET cells = ? WHERE row_num = ?',
+                         (json.dumps(cells_row, ensure_ascii=False), row))
+        conn.execute("UPDATE replica_meta SET checksum = NULL WHERE sheet_key = ? AND tab = ?",
+                     (sheet_key, tab))
+        conn.commit()
+
+
+def append_local(sheet_key, tab, rows, first_row):
+    """Add rows that were just appended to the sheet at ``first_row`` to the local copy.
+
+    Returns the sheet row numbers they were stored at, or None if the tab was
+    never synced or ``first_row`` isn't the row after the local copy (the
+    sheet has rows the replica hasn't seen), in which case nothing is written.
+    """
+    with _lock, closing(_connect()) as conn:
+        meta = _get_meta(conn, sheet_key, tab)
+        if meta is None or first_row != meta["row_count"] + 2:
+            return None
+        values = [["" if v is None else str(v) for v in row] for row in rows]
+        _append(conn, sheet_key, tab, meta, values, meta["last_sync"])
+        conn.commit()
+        return set(range(first_row, first_row + len(values)))
+
+
+# --- READ ---
+def read_header(sheet_key, tab):
+    """The tab's header row as last synced, or None if it was never synced."""
+    with closing(_connect()) as conn:
+        meta = _get_meta(conn, sheet_key, tab)
+        return None if meta is None else meta["header"]
+
+
+def read_tab(sheet_key, tab):
+    """Return the replicated tab as a DataFrame, or None if it was never synced."""
+    with closing(_connect()) as conn:
+        meta = _get_meta(conn, sheet_key, tab)
+        if meta is None:
+            return None
+        if not meta["header"]:
+            return pd.DataFrame()
+        return records_frame([meta["header"]] + _read_rows(conn, meta["table_name"]))
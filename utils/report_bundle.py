@@ -0,0 +1,189 @@
+# Report metrics, charts and the downloadable report bundle (Excel + PDF + raw data)
+import zipfile
+from io import BytesIO
+import pandas as pd
+import plotly.express as px
+from fpdf import FPDF  # Using fpdf with NGN replacement
+from utils.chart_export import render_image
+from utils.report_data import DAILY_FILE, REPORT_SHEETS, TRADE_FILE, get_col, load_workbook
+from utils.rollups import for_display, rollup
+
+
+def filter_by_date(df, start_date, end_date, date_col="date"):
+    if not df.empty and date_col in df.columns:
+        return df[(df[date_col].dt.date >= start_date) & (df[date_col].dt.date <= end_date)]
+    return pd.DataFrame()
+
+
+def load_report_frames(start_date, end_date, columns=None):
+    """Date-filtered report sheets keyed by sheet name, from both workbooks.
+
+    ``columns`` is passed to load_workbook; the default reads every column.
+    """
+    frames = {}
+    for file_path in (TRADE_FILE, DAILY_FILE):
+        book = load_workbook(file_path, columns=columns)
+        for name in REPORT_SHEETS[file_path]:
+            frames[name] = filter_by_date(book.get(name, pd.DataFrame()), start_date, end_date)
+    return frames
+
+
+# Helper functions
+def val(df, key):
+    col = get_col(df, key)
+    return df[col].sum() if col is not None and not df.empty else 0
+
+def mean(df, key):
+    col = get_col(df, key)
+    return df[col].mean() if col is not None and not df.empty else 0
+
+def safe(value):
+    try:
+        return 0 if pd.isna(value) else round(value, 2)
+    except (TypeError, ValueError):
+        return 0
+
+def currency_label(metric):
+    if metric in ["USD/NGN Profit", "Amount in NGN", "Converted Expenses"]:
+        return "NGN "  # Using NGN to avoid Unicode issues with fpdf
+    elif metric in ["Profit in USD", "Total Gross Income", "Amount in USD", "Total Expenses", "Net Profit", "Purchase Trade", "GHS Trade", "USD/NGN Transactions", "USD/USDT Swapped", "Total Bought", "Total Traded"]:
+        return "$"
+    elif metric == "Average Rate":
+        return ""
+    else:
+        return ""
+
+
+def summary_metrics(frames):
+    """Return the report's ``[(metric, amount), ...]`` summary rows."""
+    df_purchase, df_ghs, df_swap = frames["Purchase Trade"], frames["GHS Trade"], frames["Swap Trade"]
+    df_usdngn, df_expense = frames["usdngn"], frames["expenses"]
+
+    purchase_sum = val(df_purchase, 'tradesize')
+    ghs_sum = val(df_ghs, 'tradesize')
+    total_bought = purchase_sum + ghs_sum
+    usdngn_fcy = val(df_usdngn, 'fcyval')
+    usdt_due = val(df_swap, 'usdtdue')
+    total_traded = total_bought + usdngn_fcy + usdt_due
+    usdngn_profit = val(df_usdngn, 'profit')
+    buy_rate_avg = mean(df_usdngn, 'buyrate')
+    profit_usd = usdngn_profit / buy_rate_avg if buy_rate_avg else 0
+    swap_net_income = val(df_swap, 'netprofit')
+    total_gross_income = profit_usd + swap_net_income
+    amt_ngn = val(df_expense, 'amountngn')
+    converted_exp = amt_ngn / buy_rate_avg if buy_rate_avg else 0
+    amt_usd = val(df_expense, 'amountusd')
+    total_expenses = converted_exp + amt_usd
+    net_profit = total_gross_income - total_expenses
+
+    return [
+        ("Purchase Trade", purchase_sum),
+        ("GHS Trade", ghs_sum),
+        ("Total Bought", total_bought),
+        ("USD/NGN Transactions", usdngn_fcy),
+        ("USD/USDT Swapped", usdt_due),
+        ("Total Traded", total_traded),
+        ("USD/NGN Profit", usdngn_profit),
+        ("Average Rate", buy_rate_avg),
+        ("Profit in USD", profit_usd),
+        ("Net Income USD/USDT", swap_net_income),
+        ("Total Gross Income", total_gross_income),
+        ("Amount in NGN", amt_ngn),
+        ("Converted Expenses", converted_exp),
+        ("Amount in USD", amt_usd),
+        ("Total Expenses", total_expenses),
+        ("Net Profit", net_profit)
+    ]
+
+
+def report_charts(frames):
+    """Return ``[(file stem, label, figure), ...]`` for the trend charts."""
+    charts = []
+    df_usdngn, df_purchase, df_expense = frames["usdngn"], frames["Purchase Trade"], frames["expenses"]
+
+    # Chart 1: USD/NGN Profit Over Time
+    if not df_usdngn.empty:
+        profit_col = get_col(df_usdngn, 'profit')
+        chart1 = for_display(rollup(df_usdngn, [profit_col], "Daily", date_col='date'), 'date')
+        fig1 = px.line(chart1, x='date', y=profit_col, title="USD/NGN Profit Over Time")
+        charts.append(("usd_ngn_profit_chart", "USD/NGN Profit Chart", fig1))
+
+    # Chart 2: Purchase Trades Over Time
+    if not df_purchase.empty:
+        chart2 = for_display(rollup(df_purchase, ['tradesize'], "Daily", date_col='date'), 'date')
+        fig2 = px.bar(chart2, x='date', y='tradesize', title="Purchase Trades Over Time")
+        charts.append(("purchase_trades_chart", "Purchase Trades Chart", fig2))
+
+    # Chart 3: Total Expenses Over Time
+    if not df_expense.empty:
+        chart3 = for_display(rollup(df_expense, ['amountngn', 'amountusd'], "Daily", date_col='date'), 'date')
+        chart3['total_exp'] = chart3[['amountngn', 'amountusd']].sum(axis=1)
+        fig3 = px.area(chart3, x='date', y='total_exp', title="Total Expenses Over Time")
+        charts.append(("total_expenses_chart", "Total Expenses Chart", fig3))
+
+    return charts
+
+
+# PDF Export (Summary table followed by the charts)
+class PDF(FPDF):
+    def header(self):
+        self.set_font("Arial", 'B', 12)
+        self.cell(0, 10, "Salmnine Summary Report", border=False, ln=True, align='C')
+        self.ln(10)
+
+    def chapter_title(self, title):
+        self.set_font("Arial", 'B', 12)
+        self.cell(0, 10, title, 0, 1, 'L')
+        self.ln(5)
+
+    def chapter_body(self, data):
+        self.set_font("Arial", '', 11)
+        for label, amount in data:
+            self.cell(100, 10, label, 1)
+            self.cell(40, 10, f"{currency_label(label)}{safe(amount):,.2f}", 1, ln=True)
+
+
+def build_report_bundle(progress, start_date, end_date, frames):
+    """Job body: ZIP of the Excel report (summary + raw sheets) and the PDF with charts.
+
+    Runs off the script thread, so it touches no Streamlit caches: ``frames``
+    come from :func:`load_report_frames` on the page, and charts are
+    rendered uncached.
+    """
+    period = f"{start_date:%Y-%m-%d}_to_{end_date:%Y-%m-%d}"
+
+    progress(0.05, "Summarising report data")
+    summary_data = summary_metrics(frames)
+    df_export = pd.DataFrame(summary_data, columns=["Metric", "Amount"])
+    df_export["Amount"] = df_export["Amount"].apply(safe)
+
+    progress(0.2, "Writing Excel workbook")
+    excel_output = BytesIO()
+    with pd.ExcelWriter(excel_output, engine="xlsxwriter") as writer:
+        df_export.to_excel(writer, index=False, sheet_name="Summary")
+        for name, df in frames.items():
+            df.to_excel(writer, index=False, sheet_name=name[:31])
+
+    charts = report_charts(frames)
+    images = []
+    for i, (file_stem, label, fig) in enumerate(charts):
+        progress(0.4 + 0.4 * i / max(len(charts), 1), f"Rendering {label}")
+        images.append((file_stem, render_image(fig, "png")))
+
+    progress(0.85, "Writing PDF")
+    pdf = PDF()
+    pdf.add_page()
+    pdf.chapter_title("Summary Metrics")
+    pdf.chapter_body(summary_data)
+    for file_stem, png in images:
+        pdf.add_page()
+        pdf.image(BytesIO(png), w=pdf.epw)
+
+    progress(0.95, "Packing bundle")
+    bundle = BytesIO()
+    with zipfile.ZipFile(bundle, "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr(f"salmnine_report_{period}.xlsx", excel_output.getvalue())
+        zf.writestr(f"salmnine_report_{period}.pdf", bytes(pdf.output()))
+        for file_stem, png in images:
+            zf.writestr(f"charts/{file_stem}.png", png)
+    return f"salmnine_report_{period}.zip", "application/zip", bundle.getvalue()
@@ -0,0 +1,151 @@
+# Workbook loading for the Report Generation page
+import glob
+import hashlib
+import json
+import os
+import re
+import shutil
+import threading
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+import streamlit as st
+from utils.schemas import report_header
+
+TRADE_FILE = "Trade sheet.xlsx"
+DAILY_FILE = "Daily Transaction.xlsx"
+
+# Sheets the report reads from each workbook
+REPORT_SHEETS = {
+    TRADE_FILE: ("Purchase Trade", "GHS Trade", "Swap Trade"),
+    DAILY_FILE: ("usdngn", "expenses"),
+}
+
+# Numeric columns per sheet, matched by substring of the normalised header
+NUMERIC_KEYS = {
+    "Purchase Trade": ['tradesize'],
+    "GHS Trade": ['tradesize'],
+    "usdngn": ['fcyval', 'profit', 'buyrate'],
+    "Swap Trade": ['usdtdue', 'netprofit'],
+    "expenses": ['amountngn', 'amountusd'],
+}
+
+
+def get_col(df, key):
+    return next((col for col in df.columns if key in col), None)
+
+
+def _unique(names):
+    # Normalising can map two headers onto one name
+    seen = {}
+    unique = []
+    for name in names:
+        seen[name] = seen.get(name, -1) + 1
+        unique.append(f"{name}{seen[name]}" if seen[name] else name)
+    return unique
+
+
+def _type_frame(sheet_name, df):
+    df.columns = _unique(report_header(col) for col in df.columns)
+    if 'date' in df.columns:
+        df['date'] = pd.to_datetime(df['date'], errors='coerce')
+    for key in NUMERIC_KEYS.get(sheet_name, []):
+        col = get_col(df, key)
+        if col:
+            df[col] = pd.to_numeric(df[col], errors='coerce')
+    return df
+
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def _file_digest(file_path, mtime_ns, size):
+    digest = hashlib.sha1()
+    with open(file_path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def workbook_digest(file_path):
+    """Content hash of a workbook, recomputed only when its mtime or size changes."""
+    stat = os.stat(file_path)
+    return _file_digest(file_path, stat.st_mtime_ns, stat.st_size)
+
+
+# --- COLUMNAR SNAPSHOTS ---
+# Each workbook version is converted once to uncompressed Arrow IPC files,
+# one per sheet, which later loads memory-map instead of re-parsing the xlsx.
+SNAPSHOT_DIR = os.path.join("data", "report_snapshots")
+
+# Normalised header substrings the report metrics and charts read
+REPORT_COLUMNS = (
+    'date', 'tradesize', 'fcyval', 'profit', 'buyrate',
+    'usdtdue', 'netprofit', 'amountngn', 'amountusd',
+)
+
+
+def _snapshot_path(file_path, digest):
+    stem = re.sub(r'[^a-z0-9]+', '_', os.path.splitext(os.path.basename(file_path))[0].lower())
+    return os.path.join(SNAPSHOT_DIR, f"{stem}-{digest[:16]}"), stem
+
+
+def _arrow_safe(df):
+    # Untyped Excel columns can mix numbers and text, which Arrow rejects
+    for col in df.columns[df.dtypes == object]:
+        df[col] = df[col].astype(str).where(df[col].notna(), None)
+    return df
+
+
+def _build_snapshot(file_path, snapshot, stem):
+    tmp = f"{snapshot}.tmp-{os.getpid()}-{threading.get_ident()}"
+    os.makedirs(tmp, exist_ok=True)
+    with pd.ExcelFile(file_path) as xls:
+        names = list(xls.sheet_names)
+        for index, name in enumerate(names):
+            df = _arrow_safe(_type_frame(name, xls.parse(name)))
+            feather.write_feather(df.reset_index(drop=True), os.path.join(tmp, f"{index}.arrow"),
+                                  compression="uncompressed")
+    with open(os.path.join(tmp, "manifest.json"), "w", encoding="utf-8") as fh:
+        json.dump(names, fh)
+    try:
+        os.replace(tmp, snapshot)
+    except OSError:
+        # Another session finished the same snapshot first
+        shutil.rmtree(tmp, ignore_errors=True)
+    for old in glob.glob(os.path.join(SNAPSHOT_DIR, f"{stem}-*")):
+        if old != snapshot and ".tmp-" not in old:
+            shutil.rmtree(old, ignore_errors=True)
+
+
+def _read_snapshot(snapshot, names, sheet_name, columns):
+    if sheet_name not in names:
+        return pd.DataFrame()
+    path = os.path.join(snapshot, f"{names.index(sheet_name)}.arrow")
+    if columns is not None:
+        with pa.memory_map(path) as source:
+            available = pa.ipc.open_file(source).schema.names
+        columns = [col for col in available if any(key in col for key in columns)]
+    return feather.read_table(path, columns=columns, memory_map=True).to_pandas()
+
+
+def load_workbook(file_path, sheet_names=None, columns=REPORT_COLUMNS):
+    """Return ``{sheet name: typed DataFrame}`` for the report sheets of a workbook.
+
+    Sheets are read from a memory-mapped Arrow snapshot of the workbook,
+    which is rebuilt whenever the file's content hash changes. ``columns``
+    projects each sheet onto the columns whose normalised header contains
+    one of the given keys; pass None for every column. A missing file
+    returns an empty dict.
+    """
+    sheet_names = tuple(sheet_names or REPORT_SHEETS[file_path])
+    try:
+        digest = workbook_digest(file_path)
+    except FileNotFoundError:
+        return {}
+    snapshot, stem = _snapshot_path(file_path, digest)
+    manifest = os.path.join(snapshot, "manifest.json")
+    if not os.path.exists(manifest):
+        os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+        _build_snapshot(file_path, snapshot, stem)
+    with open(manifest, encoding="utf-8") as fh:
+        names = json.load(fh)
+    return {name: _read_snapshot(snapshot, names, name, columns) for name in sheet_names}
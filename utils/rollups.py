@@ -0,0 +1,152 @@
+# Calendar-period rollups shared by the trade books, usdngn and the report page
+import threading
+from datetime import date
+import pandas as pd
+from utils.sheets import DAILY_SHEET_KEY, TRADE_SHEET_KEY, load_tab, on_rows_change
+
+# Pandas period codes; "W" periods run Monday to Sunday, i.e. ISO weeks
+PERIODS = {
+    "Daily": "D",
+    "Weekly": "W",
+    "Monthly": "M",
+    "Quarterly": "Q",
+    "Yearly": "Y",
+}
+
+
+def daily_totals(df, measures, date_col="Date"):
+    """Sum ``measures`` per calendar day in one grouped pass over the rows.
+
+    Coarser periods are rolled up from this frame, so the raw history is
+    only scanned once no matter how many periods are shown.
+    """
+    measures = [m for m in measures if m in df.columns]
+    if df.empty or date_col not in df.columns:
+        return pd.DataFrame(columns=measures, index=pd.PeriodIndex([], freq="D"), dtype="float64")
+    days = df[date_col].dt.to_period("D").rename(None)
+    return df[measures].groupby(days, sort=True).sum()
+
+
+def rollup(df=None, measures=None, period="Weekly", date_col="Date", daily=None):
+    """Totals of ``measures`` per ``period``, indexed by real calendar periods.
+
+    Pass ``daily`` (from :func:`daily_totals`) to reuse an earlier pass.
+    """
+    if daily is None:
+        daily = daily_totals(df, measures, date_col)
+    freq = PERIODS[period]
+    if freq == "D":
+        return daily
+    return daily.groupby(daily.index.asfreq(freq), sort=True).sum()
+
+
+def current_totals(df=None, measures=None, periods=("Daily", "Weekly", "Monthly"),
+                   today=None, date_col="Date", daily=None):
+    """One row per period holding the totals of the period containing ``today``."""
+    today = pd.Period(today or date.today(), freq="D")
+    if daily is None:
+        daily = daily_totals(df, measures, date_col)
+    rows = []
+    for period in periods:
+        current = today.asfreq(PERIODS[period])
+        in_period = daily.index.asfreq(PERIODS[period]) == current
+        rows.append(daily[in_period].sum())
+    summary = pd.DataFrame(rows, columns=daily.columns).fillna(0)
+    summary.insert(0, "Period", list(periods))
+    return summary.reset_index(drop=True)
+
+
+def for_display(rolled, label="Period"):
+    """Turn a rollup's period index into a string column for tables and charts."""
+    out = rolled.reset_index(names=label)
+    periods = pd.PeriodIndex(out[label])
+    if periods.freqstr.startswith("W"):
+        iso = periods.start_time.isocalendar()
+        out[label] = [f"{y}-W{w:02d}" for y, w in zip(iso["year"], iso["week"])]
+    else:
+        out[label] = periods.astype(str)
+    return out
+
+
+# --- MATERIALISED ROLLUPS ---
+# Totals per tab and granularity, kept up to date from the rows that changed
+# on each reload instead of rescanning the tab's history on every rerun.
+MATERIALISED = ("Daily", "Weekly", "Monthly")
+
+
+def _sales_only(df):
+    return df[df["Transaction Type"].astype(str).str.lower() == "sales"]
+
+
+# (sheet key, tab) -> (measures, optional row filter)
+ROLLUPS = {
+    (TRADE_SHEET_KEY, "USD Trade"): (["Trade Size", "Amount", "Income"], None),
+    (TRADE_SHEET_KEY, "GHS Trade"): (["Trade Size", "Amount Ghs", "Income"], None),
+    (TRADE_SHEET_KEY, "Swap Trade"): (["Usd Received", "Usdt Due", "Net Profit"], None),
+    (TRADE_SHEET_KEY, "Purchase Trade"): (["Trade Size", "NGN Amount"], None),
+    (DAILY_SHEET_KEY, "usdngn"): (["Profit (Ngn)", "Lcy Value", "Fcy Total Value"], _sales_only),
+}
+
+_tables = {}   # (sheet_key, tab) -> {granularity: DataFrame}
+_tables_lock = threading.Lock()
+
+
+def _tab_totals(key, rows):
+    measures, row_filter = ROLLUPS[key]
+    if row_filter is not None and not rows.empty:
+        rows = row_filter(rows)
+    return daily_totals(rows, measures)
+
+
+def _build(key, frame):
+    daily = _tab_totals(key, frame)
+    return {period: rollup(period=period, daily=daily) for period in MATERIALISED}
+
+
+def _apply_rows(sheet_key, tab, old_rows, new_rows):
+    key = (sheet_key, tab)
+    if old_rows is None:
+        tables = _build(key, new_rows)
+        with _tables_lock:
+            _tables[key] = tables
+        return
+    delta = _tab_totals(key, new_rows).sub(_tab_totals(key, old_rows), fill_value=0)
+    if delta.empty:
+        return
+    with _tables_lock:
+        tables = _tables.get(key)
+        if tables is None:
+            return
+        for period in MATERIALISED:
+            step = rollup(period=period, daily=delta)
+            tables[period] = tables[period].add(step, fill_value=0)
+
+
+for _sheet_key, _tab in ROLLUPS:
+    on_rows_change(_sheet_key, _tab, _apply_rows)
+
+
+def get_rollup(sheet_key, tab, period="Daily", start=None, end=None):
+    """Materialised totals of a tab's measures per ``period``.
+
+    Without a date range the stored table is returned as is; with one, the
+    range is cut from the daily table and rolled up from there.
+    """
+    key = (sheet_key, tab)
+    frame = load_tab(sheet_key, tab, copy=False)
+    with _tables_lock:
+        tables = _tables.get(key)
+    if tables is None:
+        # The tab was loaded before this module registered its listener
+        tables = _build(key, frame)
+        with _tables_lock:
+            tables = _tables.setdefault(key, tables)
+    if start is None and end is None:
+        return tables[period].copy()
+    days = tables["Daily"].index
+    keep = pd.Series(True, index=days)
+    if start is not None:
+        keep &= days >= pd.Period(start, freq="D")
+    if end is not None:
+        keep &= days <= pd.Period(end, freq="D")
+    return rollup(period=period, daily=tables["Daily"][keep.values])
@@ -0,0 +1,34 @@
+# Per-row content hashes, for finding exactly which rows of a table changed
+from collections import namedtuple
+import pandas as pd
+
+# Sets of row keys (sheet row numbers for loaded tabs)
+RowChanges = namedtuple("RowChanges", ["inserted", "updated", "deleted"])
+
+
+def hash_rows(df):
+    """One uint64 content hash per row of ``df``, keyed by its index.
+
+    Hashes depend on the column order and dtypes, so compare frames only
+    after giving them the same columns and types.
+    """
+    if df.columns.empty:
+        return pd.Series(0, index=df.index, dtype="uint64")
+    return pd.util.hash_pandas_object(df, index=False, categorize=True)
+
+
+def diff_hashes(old, new):
+    """Row keys added, changed and removed between two :func:`hash_rows` results."""
+    old = old[~old.index.duplicated()]
+    new = new[~new.index.duplicated()]
+    common = old.index.intersection(new.index)
+    changed = old.loc[common].to_numpy() != new.loc[common].to_numpy()
+    return RowChanges(
+        inserted=set(new.index.difference(old.index).tolist()),
+        updated=set(common[changed].tolist()),
+        deleted=set(old.index.difference(new.index).tolist()),
+    )
+
+
+def changed_keys(changes):
+    return changes.inserted | changes.updated | changes.deleted
@@ -0,0 +1,136 @@
+# Declared column types per sheet tab, applied once when a tab is loaded
+import re
+import pandas as pd
+
+# Hidden column holding each row's stable ID (see utils.sheets)
+ROW_ID = "_id"
+
+DATETIME = "datetime"
+FLOAT = "float"
+CATEGORY = "category"
+TEXT = "text"
+
+
+def title_header(col):
+    return str(col).strip().title()
+
+
+def strip_header(col):
+    return str(col).strip()
+
+
+def report_header(col):
+    return re.sub(r'[^a-z0-9]', '', str(col).lower())
+
+
+class TabSchema:
+    def __init__(self, columns, normalize=title_header, required=("Date",)):
+        self.columns = columns
+        self.normalize = normalize
+        self.required = required
+
+
+_TRADE_COMMON = {
+    "Date": DATETIME,
+    "Buy/Sell": CATEGORY,
+    "Trade Customer": CATEGORY,
+    "Trade Currency": CATEGORY,
+    "Trade Size": FLOAT,
+}
+
+SCHEMAS = {
+    "USD Trade": TabSchema({
+        **_TRADE_COMMON,
+        "Sell Rate": FLOAT, "Amount": FLOAT, "Usd Received": FLOAT, "Usd Paid Out": FLOAT,
+        "Commission": FLOAT, "Income": FLOAT, "Buy Rate": FLOAT,
+    }),
+    "GHS Trade": TabSchema({
+        **_TRADE_COMMON,
+        "Sell Rate": FLOAT, "Amount Ghs": FLOAT, "Received": FLOAT, "Paid Out": FLOAT,
+        "Commission": FLOAT, "Income": FLOAT, "Buy Rate": FLOAT, "Amount Ghs 2": FLOAT,
+        "Trade Customer 2": CATEGORY, "Trade Size 2": FLOAT,
+    }),
+    "Swap Trade": TabSchema({
+        "Date": DATETIME, "Client": CATEGORY, "Usd Received": FLOAT, "Charges %": FLOAT,
+        "Charges (Usdt)": FLOAT, "Usdt Due": FLOAT, "Usdt Paid": FLOAT,
+        "Usd Status": CATEGORY, "Usdt Status": CATEGORY,
+        "Date Received": DATETIME, "Date Sent": DATETIME, "Net Profit": FLOAT,
+    }),
+    # The purchase module reads the sheet's own header spelling ("NGN Amount")
+    "Purchase Trade": TabSchema({
+        **_TRADE_COMMON,
+        "Rate": FLOAT, "NGN Amount": FLOAT, "Naira Paid": FLOAT, "Naira Balance": FLOAT,
+    }, normalize=strip_header),
+    "usdngn": TabSchema({
+        "Date": DATETIME, "Month": CATEGORY, "Selling Client": CATEGORY,
+        "Bank Paid From": CATEGORY, "Buy Rate": FLOAT, "Buying Client": CATEGORY,
+        "Transaction Type": CATEGORY, "Sell Rate": FLOAT, "Fcy Total Value": FLOAT,
+        "Total Fcy Paid To Client": FLOAT, "Lcy Payments": FLOAT, "Profit (Ngn)": FLOAT,
+        "Spread": FLOAT, "Lcy Value": FLOAT, "Fcy Outstanding": FLOAT,
+        "Lcy Outstanding": FLOAT, "Commission": FLOAT, "Our Obli. Status": CATEGORY,
+        "Customer Obli Status": CATEGORY, "Status": CATEGORY,
+    }, normalize=strip_header),
+    "expenses": TabSchema({
+        "Date": DATETIME, "Expense Description": TEXT, "Amount Ngn": FLOAT,
+        "Amount Usd": FLOAT, "Bank": CATEGORY,
+    }),
+    "at_a_glance": TabSchema({
+        "Date": DATETIME, "Account Name": CATEGORY, "Opening Balance": FLOAT,
+        "Closing Balance": FLOAT, "Inflow": FLOAT, "Outflow": FLOAT,
+    }),
+    "List of A/C": TabSchema({
+        "Account Name": TEXT, "Account Number": TEXT, "Bank": CATEGORY,
+        "Bank Details": TEXT, "Concession Usd": FLOAT, "Concession Ngn": FLOAT,
+    }, required=()),
+}
+
+
+def _blank(series):
+    return series.isna() | (series.astype(str).str.strip() == "")
+
+
+def apply_schema(tab, df):
+    """Return ``(typed_df, quarantine_df)`` for a freshly loaded tab.
+
+    Headers are normalised and declared columns parsed to datetime64 /
+    float64 / category. Rows whose required columns do not parse are moved to
+    the quarantine frame; rows with unparseable numbers stay (as NaN) but are
+    reported there too. Tabs without a schema pass through unchanged.
+    """
+    schema = SCHEMAS.get(tab)
+    if schema is None or df.empty:
+        return df, pd.DataFrame()
+
+    df = df.copy()
+    df.columns = [col if col == ROW_ID else schema.normalize(col) for col in df.columns]
+    raw_df = df.copy()
+    # Blank spacer rows are neither data nor worth reporting
+    empty = raw_df.drop(columns=[ROW_ID], errors="ignore").apply(_blank).all(axis=1)
+    problems = pd.Series("", index=df.index)
+
+    for col, kind in schema.columns.items():
+        if col not in df.columns:
+            continue
+        raw = df[col]
+        if kind == CATEGORY:
+            df[col] = raw.astype(str).str.strip().astype("category")
+            continue
+        if kind == TEXT:
+            df[col] = raw.astype(str)
+            continue
+        values = raw.where(~_blank(raw))
+        if kind == DATETIME:
+            parsed = pd.to_datetime(values, errors="coerce")
+        else:
+            parsed = pd.to_numeric(values, errors="coerce").astype("float64")
+        bad = parsed.isna() & ~_blank(raw)
+        if col in schema.required:
+            bad |= _blank(raw)
+        problems[bad & ~empty] += f"bad {col}; "
+        df[col] = parsed
+
+    required = [c for c in schema.required if c in df.columns]
+    drop = empty | df[required].isna().any(axis=1) if required else empty
+    flagged = problems != ""
+    quarantine = raw_df[flagged].assign(Problem=problems[flagged].str.rstrip("; "))
+    return df[~drop], quarantine
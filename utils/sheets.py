@@ -0,0 +1,336 @@
+# Shared Google Sheets handles (spreadsheets and worksheets)
+import logging
+import threading
+import time
+import uuid
+import pandas as pd
+import streamlit as st
+from gspread.exceptions import WorksheetNotFound
+from gspread.utils import a1_range_to_grid_range, rowcol_to_a1
+from utils import replica
+from utils.auth import get_gspread_client
+from utils.row_hashes import changed_keys, diff_hashes, hash_rows
+from utils.schemas import ROW_ID, apply_schema
+
+log = logging.getLogger(__name__)
+
+# --- HANDLE REGISTRY ---
+# Opened Spreadsheet / Worksheet objects keyed by sheet key and tab name, so a
+# warm server never repeats open_by_key or worksheet metadata calls.
+_spreadsheets = {}
+_worksheets = {}
+_handles_lock = threading.RLock()
+
+
+def get_spreadsheet(sheet_key):
+    with _handles_lock:
+        sheet = _spreadsheets.get(sheet_key)
+        if sheet is None:
+            sheet = get_gspread_client().open_by_key(sheet_key)
+            _spreadsheets[sheet_key] = sheet
+        return sheet
+
+
+def get_worksheet(sheet_key, tab_name):
+    with _handles_lock:
+        ws = _worksheets.get((sheet_key, tab_name))
+        if ws is None:
+            # One metadata call registers every tab of the spreadsheet
+            for tab in get_spreadsheet(sheet_key).worksheets():
+                _worksheets[(sheet_key, tab.title)] = tab
+            ws = _worksheets.get((sheet_key, tab_name))
+        if ws is None:
+            # Fall back to gspread's own lookup so callers get WorksheetNotFound
+            try:
+                ws = get_spreadsheet(sheet_key).worksheet(tab_name)
+            except WorksheetNotFound:
+                # Tabs were renamed or deleted; the other cached handles may be stale too
+                forget_spreadsheet(sheet_key)
+                raise
+            _worksheets[(sheet_key, tab_name)] = ws
+        return ws
+
+
+def forget_spreadsheet(sheet_key):
+    """Drop cached handles for a spreadsheet (e.g. after tabs were renamed)."""
+    with _handles_lock:
+        _spreadsheets.pop(sheet_key, None)
+        for key in [k for k in _worksheets if k[0] == sheet_key]:
+            del _worksheets[key]
+
+
+# --- TAB LOADING ---
+TRADE_SHEET_KEY = "1eQS-LZLfsGmhySVHS6ETaKNmBP6bRngtDUiy-Nq0YXw"
+DAILY_SHEET_KEY = "1PqngUtZTmt0c_CV8uq--3HHMx40SvBE3yB-FICcLpiA"
+DATABASE_SHEET_KEY = "1j_D2QiaS3IEJuNI27OA56l8nWWatzxidLKuqV4Dfet4"
+BANK_SHEET_KEY = "1RJPEK_ye59vA8ngWiTUYkJZ-xOc815TyKsQ3-f6u4kk"
+
+# Tabs that are read together; each spreadsheet is synced in one round trip
+SHEET_TABS = {
+    TRADE_SHEET_KEY: ("Purchase Trade", "USD Trade", "GHS Trade", "Swap Trade"),
+    DAILY_SHEET_KEY: ("at_a_glance", "usdngn", "expenses"),
+    DATABASE_SHEET_KEY: ("Client List", "Seller List", "Transaction type"),
+    BANK_SHEET_KEY: ("List of A/C",),
+}
+
+
+# Synced frames are reused for this long before the next delta sync
+TAB_TTL = 60
+
+_frames = {}       # (sheet_key, tab) -> (loaded_at, typed DataFrame)
+_quarantine = {}   # (sheet_key, tab) -> rows that failed schema parsing
+_hashes = {}       # (sheet_key, tab) -> content hash per sheet row of the typed frame
+_row_ids = {}      # (sheet_key, tab) -> {row ID: sheet row}
+_versions = {}     # (sheet_key, tab) -> version, bumped whenever the tab changes
+_row_listeners = {}  # (sheet_key, tab) -> [callback, ...] fed changed rows on reload
+_dirty = {}        # (sheet_key, tab) -> row numbers written locally, or None if unknown
+_sheet_locks = {}
+_registry_lock = threading.Lock()
+
+
+def _sheet_lock(sheet_key):
+    with _registry_lock:
+        return _sheet_locks.setdefault(sheet_key, threading.Lock())
+
+
+def tab_version(sheet_key, tab_name):
+    """Version stamp of a tab; derived caches include it in their key."""
+    with _registry_lock:
+        return _versions.get((sheet_key, tab_name), 0)
+
+
+def on_rows_change(sheet_key, tab_name, callback):
+    """Register ``callback(sheet_key, tab_name, old_rows, new_rows)`` for reloads.
+
+    ``old_rows`` / ``new_rows`` are the typed rows that changed, before and
+    after, indexed by sheet row number. When the change is not known row by
+    row ``old_rows`` is None and ``new_rows`` is the whole new frame.
+    """
+    with _registry_lock:
+        callbacks = _row_listeners.setdefault((sheet_key, tab_name), [])
+        if callback not in callbacks:
+            callbacks.append(callback)
+
+
+def _mark_dirty(sheet_key, tab_name, rows):
+    key = (sheet_key, tab_name)
+    if rows is None or (key in _dirty and _dirty[key] is None):
+        _dirty[key] = None
+    else:
+        _dirty[key] = _dirty.get(key, set()) | set(rows)
+
+
+def _notify_rows(sheet_key, tab_name, old_frame, new_frame, rows):
+    with _registry_lock:
+        callbacks = list(_row_listeners.get((sheet_key, tab_name), []))
+    if not callbacks:
+        return
+    if old_frame is None or rows is None:
+        old_rows, new_rows = None, new_frame
+    else:
+        rows = sorted(rows)
+        old_rows = old_frame.loc[old_frame.index.intersection(rows)]
+        new_rows = new_frame.loc[new_frame.index.intersection(rows)]
+    for callback in callbacks:
+        callback(sheet_key, tab_name, old_rows, new_rows)
+
+
+def _bump(sheet_key, tab_name):
+    with _registry_lock:
+        _versions[(sheet_key, tab_name)] = _versions.get((sheet_key, tab_name), 0) + 1
+
+
+def _sync(sheet_key, tabs):
+    try:
+        changed = replica.sync_sheet(get_spreadsheet(sheet_key), sheet_key, tabs)
+    except Exception:
+        # Reopen the spreadsheet next time in case a handle went stale
+        forget_spreadsheet(sheet_key)
+        # Keep serving the local copy while Google Sheets is unreachable
+        if any(replica.read_tab(sheet_key, tab) is None for tab in tabs):
+            raise
+        log.warning("Sync of %s failed; serving local replica", sheet_key, exc_info=True)
+        changed = {}
+    now = time.time()
+    for tab in tabs:
+        key = (sheet_key, tab)
+        if tab in changed:
+            _mark_dirty(sheet_key, tab, changed[tab])
+        if key in _dirty or key not in _frames:
+            old_frame = _frames[key][1] if key in _frames else None
+            # Parse to the declared dtypes once here, not on every rerun
+            raw = replica.read_tab(sheet_key, tab)
+            frame, quarantine = apply_schema(tab, raw)
+            hashes = hash_rows(frame)
+            rows = _dirty.pop(key, None)
+            if rows is None and old_frame is not None and old_frame.columns.equals(frame.columns):
+                # A full re-read: the row hashes say exactly which rows moved
+                rows = changed_keys(diff_hashes(_hashes[key], hashes))
+            _frames[key] = (now, frame)
+            _hashes[key] = hashes
+            # Built from the raw rows so quarantined rows can still be found
+            _row_ids[key] = _index_ids(raw)
+            _quarantine[key] = quarantine
+            _notify_rows(sheet_key, tab, old_frame, frame, rows)
+        else:
+            _frames[(sheet_key, tab)] = (now, _frames[(sheet_key, tab)][1])
+    for tab in changed:
+        _bump(sheet_key, tab)
+
+
+def load_tab(sheet_key, tab_name, copy=True):
+    """Return one tab as a DataFrame read from the local replica.
+
+    When the tab is older than TAB_TTL it is delta-synced together with its
+    registered sibling tabs in one round trip. ``copy=False`` returns the
+    shared frame for read-only use.
+    """
+    with _sheet_lock(sheet_key):
+        cached = _frames.get((sheet_key, tab_name))
+        if cached is None or time.time() - cached[0] >= TAB_TTL:
+            tabs = SHEET_TABS.get(sheet_key, ())
+            _sync(sheet_key, tabs if tab_name in tabs else (tab_name,))
+        frame = _frames[(sheet_key, tab_name)][1]
+    # Frames are shared between sessions, so callers get their own copy
+    return frame.copy() if copy else frame
+
+
+def get_row_hashes(sheet_key, tab_name):
+    """Content hash per sheet row of the tab as last loaded (see utils.row_hashes)."""
+    load_tab(sheet_key, tab_name, copy=False)
+    return _hashes[(sheet_key, tab_name)]
+
+
+# --- ROW IDS ---
+# Tabs carry a hidden ROW_ID column so grid edits map back to the right sheet
+# row whatever the view's filter or sort. Adding the column changes the live
+# sheet, so it is an explicit admin step (add_row_ids), never part of a load.
+def _index_ids(raw):
+    # Blank and repeated IDs can't name a single row, so they aren't indexed
+    if raw is None or ROW_ID not in raw.columns:
+        return {}
+    ids = raw[ROW_ID].astype(str).str.strip()
+    keep = (ids != "") & ~ids.duplicated(keep=False)
+    return dict(zip(ids[keep], raw.index[keep]))
+
+
+def tabs_without_row_ids():
+    """Registered ``(sheet_key, tab)`` pairs whose replicated header has no ROW_ID."""
+    return [(sheet_key, tab) for sheet_key, tabs in SHEET_TABS.items() for tab in tabs
+            if row_id_column(sheet_key, tab) is None]
+
+
+def add_row_ids(sheet_key, tab_name):
+    """Add a hidden ROW_ID column to a tab and give every non-blank row an ID.
+
+    Writes to the live sheet. Returns the number of rows given an ID; raises
+    ValueError when the tab already has IDs or the column after its header
+    isn't empty.
+    """
+    # Work from a fresh full read so the IDs line up with the sheet's rows
+    invalidate_tab(sheet_key, tab_name)
+    load_tab(sheet_key, tab_name, copy=False)
+    raw = replica.read_tab(sheet_key, tab_name)
+    if raw is None or raw.columns.empty:
+        raise ValueError(f"{tab_name} has no header row")
+    if ROW_ID in raw.columns:
+        raise ValueError(f"{tab_name} already has row IDs")
+    worksheet = get_worksheet(sheet_key, tab_name)
+    col = len(raw.columns) + 1
+    if col > worksheet.col_count:
+        worksheet.add_cols(col - worksheet.col_count)
+    elif any(str(v).strip() for v in worksheet.col_values(col) if v is not None):
+        raise ValueError(f"Column {col} of {tab_name} is not empty")
+    filled = (raw.astype(str).apply(lambda s: s.str.strip()) != "").any(axis=1)
+    values = [[ROW_ID]] + [[new_row_id() if f else ""] for f in filled]
+    worksheet.update(range_name=f"{rowcol_to_a1(1, col)}:{rowcol_to_a1(len(values), col)}",
+                     values=values, value_input_option="RAW")
+    worksheet.hide_columns(col - 1, col)
+    invalidate_tab(sheet_key, tab_name)
+    return int(filled.sum())
+
+
+def new_row_id():
+    return uuid.uuid4().hex
+
+
+def row_id_column(sheet_key, tab_name):
+    """1-based sheet column of the tab's ROW_ID, or None if it has none yet."""
+    header = replica.read_header(sheet_key, tab_name) or []
+    return header.index(ROW_ID) + 1 if ROW_ID in header else None
+
+
+def with_row_id(sheet_key, tab_name, row, row_id=None):
+    """``row`` (in sheet column order) with ``row_id`` in the tab's ID column."""
+    row = list(row)
+    col = row_id_column(sheet_key, tab_name)
+    if col is None:
+        return row
+    row.extend([""] * (col - len(row)))
+    if not str(row[col - 1]).strip():
+        row[col - 1] = row_id or new_row_id()
+    return row
+
+
+def find_row(sheet_key, tab_name, row_id):
+    """Sheet row number of ``row_id`` as of the last load, or None."""
+    load_tab(sheet_key, tab_name, copy=False)
+    return _row_ids.get((sheet_key, tab_name), {}).get(row_id)
+
+
+def get_quarantine(sheet_key, tab_name):
+    """Rows of the last load that did not match the tab's schema."""
+    return _quarantine.get((sheet_key, tab_name), pd.DataFrame()).copy()
+
+
+def render_quarantine(sheet_key, tab_name):
+    quarantine = get_quarantine(sheet_key, tab_name)
+    if not quarantine.empty:
+        with st.expander(f"⚠️ {len(quarantine)} row(s) in '{tab_name}' need attention"):
+            st.caption("Sheet row numbers are shown on the left. Fix these rows in Google Sheets.")
+            st.dataframe(quarantine, use_container_width=True)
+
+
+def invalidate_tab(sheet_key, tab_name, full_sync=True, rows=None):
+    """Evict one tab and everything derived from it.
+
+    ``full_sync`` re-reads the whole tab on the next load (Refresh buttons);
+    writers that already patched the replica pass ``full_sync=False`` and the
+    sheet ``rows`` they touched, so derived data can be updated in place.
+    """
+    with _sheet_lock(sheet_key):
+        key = (sheet_key, tab_name)
+        if key in _frames:
+            # Keep the old frame around to diff the touched rows against
+            _frames[key] = (0, _frames[key][1])
+        _mark_dirty(sheet_key, tab_name, None if full_sync else rows)
+        if full_sync:
+            replica.request_full_sync(sheet_key, tab_name)
+    _bump(sheet_key, tab_name)
+
+
+def _appended_first_row(response):
+    """First sheet row an ``append_rows`` response says it wrote, or None."""
+    try:
+        updated = response["updates"]["updatedRange"]
+        return a1_range_to_grid_range(updated.rsplit("!", 1)[-1])["startRowIndex"] + 1
+    except (TypeError, KeyError, ValueError):
+        return None
+
+
+def record_append(sheet_key, tab_name, rows, response):
+    """Mirror rows just appended to the sheet into the replica and evict the tab.
+
+    ``response`` is what ``append_rows`` / ``append_row`` returned; its
+    ``updatedRange`` says where Sheets put the rows. If that isn't right
+    after the local copy (rows were added in Sheets since the last sync) the
+    tab is re-read in full rather than guessing.
+    """
+    first_row = _appended_first_row(response)
+    appended = None
+    if first_row is not None:
+        appended = replica.append_local(sheet_key, tab_name, rows, first_row)
+    if appended is None:
+        invalidate_tab(sheet_key, tab_name)
+    else:
+        invalidate_tab(sheet_key, tab_name, full_sync=False, rows=appended)
@@ -0,0 +1,203 @@
+# Background write-behind queue for form submissions
+import logging
+import random
+import threading
+import time
+import requests
+import streamlit as st
+from gspread.exceptions import APIError
+from utils.sheets import get_worksheet, invalidate_tab, new_row_id, record_append, row_id_column, with_row_id
+
+# Wait this long after the first queued row so a burst goes out as one call
+FLUSH_DELAY = 0.5
+MAX_ATTEMPTS = 6
+BACKOFF_BASE = 1.0
+BACKOFF_CAP = 60.0
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+PENDING = "pending"
+COMMITTED = "committed"
+FAILED = "failed"
+
+log = logging.getLogger(__name__)
+
+
+class _Entry:
+    def __init__(self, key, sheet_key, tab, row):
+        self.key = key
+        self.sheet_key = sheet_key
+        self.tab = tab
+        self.row = row
+        self.status = PENDING
+        self.error = None
+        self.submitted_at = time.time()
+
+
+# --- QUEUE STATE ---
+_cond = threading.Condition()
+_queues = {}      # (sheet_key, tab) -> [entry, ...] waiting to be appended
+_attempts = {}    # (sheet_key, tab) -> failed attempts of the current batch
+_retry_at = {}    # (sheet_key, tab) -> earliest time of the next attempt
+_entries = {}     # idempotency key -> entry
+_worker = None
+
+
+def submit_row(sheet_key, tab, row, key=None):
+    """Queue ``row`` for appending to ``tab`` and return its idempotency key.
+
+    The key doubles as the new row's ID in the tab's ROW_ID column.
+    Submitting a key that is already pending or committed is a no-op.
+    """
+    global _worker
+    key = key or new_row_id()
+    with _cond:
+        existing = _entries.get(key)
+        if existing is not None and existing.status != FAILED:
+            return key
+        entry = _Entry(key, sheet_key, tab, with_row_id(sheet_key, tab, row, key))
+        _entries[key] = entry
+        _queues.setdefault((sheet_key, tab), []).append(entry)
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=_run, name="sheets-write-queue", daemon=True)
+            _worker.start()
+        _cond.notify()
+    return key
+
+
+def get_status(key):
+    with _cond:
+        entry = _entries.get(key)
+        return (entry.status, entry.error) if entry else (None, None)
+
+
+# --- WORKER ---
+def _next_ready(now):
+    ready = [k for k, q in _queues.items() if q and _retry_at.get(k, 0) <= now]
+    waits = [_retry_at.get(k, 0) - now for k, q in _queues.items() if q and k not in ready]
+    return ready, (min(waits) if waits else None)
+
+
+def _run():
+    while True:
+        with _cond:
+            ready, wait = _next_ready(time.time())
+            while not ready:
+                _cond.wait(timeout=wait)
+                ready, wait = _next_ready(time.time())
+        time.sleep(FLUSH_DELAY)
+        with _cond:
+            batches = {k: list(_queues[k]) for k in ready}
+        for tab_key, entries in batches.items():
+            _flush(tab_key, entries)
+
+
+def _already_appended(worksheet, sheet_key, tab, entries):
+    # After an ambiguous failure the append may have landed; only a row's ID
+    # proves that. Tabs without IDs are retried as-is: a possible duplicate
+    # row beats silently dropping a real, identical submission.
+    id_col = row_id_column(sheet_key, tab)
+    if id_col is None:
+        return set()
+    ids = set(worksheet.col_values(id_col))
+    return {entry.key for entry in entries if entry.key in ids}
+
+
+def _retryable(exc):
+    if isinstance(exc, APIError):
+        return exc.response.status_code in RETRYABLE_STATUS
+    return isinstance(exc, requests.exceptions.RequestException)
+
+
+def _finish(tab_key, entries, status, error=None):
+    keys = {e.key for e in entries}
+    with _cond:
+        _queues[tab_key] = [e for e in _queues.get(tab_key, []) if e.key not in keys]
+        for entry in entries:
+            entry.status = status
+            entry.error = error
+
+
+def _reset_retries(tab_key):
+    with _cond:
+        _attempts.pop(tab_key, None)
+        _retry_at.pop(tab_key, None)
+
+
+def _flush(tab_key, entries):
+    sheet_key, tab = tab_key
+    attempts = _attempts.get(tab_key, 0)
+    landed = set()
+    try:
+        worksheet = get_worksheet(sheet_key, tab)
+        if attempts:
+            landed = _already_appended(worksheet, sheet_key, tab, entries)
+            _finish(tab_key, [e for e in entries if e.key in landed], COMMITTED)
+            entries = [e for e in entries if e.key not in landed]
+        response = worksheet.append_rows([e.row for e in entries]) if entries else None
+    except Exception as exc:
+        attempts += 1
+        if not _retryable(exc) or attempts >= MAX_ATTEMPTS:
+            log.error("Giving up on %d row(s) for %s", len(entries), tab, exc_info=True)
+            _finish(tab_key, entries, FAILED, str(exc))
+            _reset_retries(tab_key)
+            return
+        delay = min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempts) + random.uniform(0, 1)
+        log.warning("Append to %s failed (attempt %d), retrying in %.1fs", tab, attempts, delay)
+        with _cond:
+            _attempts[tab_key] = attempts
+            _retry_at[tab_key] = time.time() + delay
+        return
+
+    # The rows are in the sheet now; a failure below only leaves the local
+    # copy stale until the next sync, so it must not mark them failed
+    _finish(tab_key, entries, COMMITTED)
+    _reset_retries(tab_key)
+    try:
+        if landed:
+            invalidate_tab(sheet_key, tab)
+        elif entries:
+            record_append(sheet_key, tab, [e.row for e in entries], response)
+    except Exception:
+        log.error("Appended %d row(s) to %s but could not update the local copy",
+                  len(entries), tab, exc_info=True)
+
+
+# --- UI ---
+def queue_row(sheet_key, tab, row):
+    """Queue a form row and remember it for this session's status panel."""
+    key = submit_row(sheet_key, tab, row)
+    st.session_state.setdefault("write_queue", {})[key] = (tab, row)
+    return key
+
+
+def _session_statuses():
+    # (tab, row, status, error) for each row this session queued
+    submitted = st.session_state.get("write_queue", {})
+    return [(tab, row, *get_status(key)) for key, (tab, row) in submitted.items()]
+
+
+def _write_status(polling):
+    statuses = _session_statuses()
+    pending = [tab for tab, _, status, _ in statuses if status == PENDING]
+    if pending:
+        tabs = ", ".join(sorted(set(pending)))
+        st.caption(f"⏳ {len(pending)} submission(s) pending for {tabs} — saving to Google Sheets…")
+    elif statuses and statuses[-1][2] == COMMITTED:
+        st.caption("✅ All submissions committed to Google Sheets.")
+    for tab, row, status, error in statuses:
+        if status == FAILED:
+            st.error(f"❌ {tab} submission could not be saved: {error}. Row: {row}")
+    if polling and not pending:
+        # Everything has landed: rerun the page so its tables show the new
+        # rows, and the panel stops polling
+        st.rerun()
+
+
+def render_write_status():
+    """One status panel for this session's queued submissions.
+
+    Call it once per page. It only polls (every 2 seconds) while some of
+    the session's submissions are still pending.
+    """
+    polling = any(status == PENDING for _, _, status, _ in _session_statuses())
+    st.fragment(_write_status, run_every=2 if polling else None)(polling)
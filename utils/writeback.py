@@ -0,0 +1,192 @@
+# Cell-level writeback of AgGrid edits to Google Sheets
+import pandas as pd
+from gspread.utils import rowcol_to_a1
+from utils import replica
+from utils.row_hashes import RowChanges, diff_hashes, hash_rows
+from utils.schemas import ROW_ID
+from utils.sheets import find_row, get_row_hashes, get_worksheet, invalidate_tab, load_tab, row_id_column
+
+# Hidden grid column carrying each row's position in the sheet; loaded tabs
+# are indexed by sheet row, so filtered and sorted views still point at the
+# right rows when their edits come back
+ROW_COL = "_row"
+
+
+def _as_dtype_of(values, like):
+    # The grid hands values back as JSON types; compare them as the loaded dtype
+    if pd.api.types.is_datetime64_any_dtype(like):
+        return pd.to_datetime(values, errors="coerce", utc=True).dt.tz_localize(None)
+    if pd.api.types.is_numeric_dtype(like) and not pd.api.types.is_bool_dtype(like):
+        return pd.to_numeric(values, errors="coerce")
+    return values
+
+
+def _cell_value(value):
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return ""
+    if hasattr(value, "strftime"):
+        return value.strftime("%Y-%m-%d")
+    if hasattr(value, "item"):
+        return value.item()
+    return value
+
+
+def _has_keys(updated, original):
+    if updated is None or updated.empty:
+        return False
+    return (ROW_ID in updated.columns and ROW_ID in original.columns) or ROW_COL in updated.columns
+
+
+def _grid_rows(updated, original):
+    """Grid data keyed by sheet row.
+
+    A row is placed by its ROW_ID when that ID is non-blank and unique in
+    ``original``, otherwise by its ROW_COL. Rows that can't be placed, or
+    that would land on the same sheet row as another, are dropped, so two
+    grid rows never map to one sheet row.
+    """
+    if ROW_COL in updated.columns:
+        rows = pd.to_numeric(updated[ROW_COL], errors="coerce")
+    else:
+        rows = pd.Series(float("nan"), index=updated.index)
+    if ROW_ID in updated.columns and ROW_ID in original.columns:
+        ids = original[ROW_ID].astype(str).str.strip()
+        unique = (ids != "") & ~ids.duplicated(keep=False)
+        rows_by_id = pd.Series(original.index[unique], index=ids[unique].to_numpy())
+        by_id = updated[ROW_ID].astype(str).str.strip().map(rows_by_id)
+        rows = by_id.where(by_id.notna(), rows)
+    updated = updated.drop(columns=[ROW_COL], errors="ignore").assign(**{ROW_COL: rows})
+    updated = updated.dropna(subset=[ROW_COL]).astype({ROW_COL: int}).set_index(ROW_COL)
+    return updated[~updated.index.duplicated(keep=False)]
+
+
+def _conform(updated, original):
+    """Grid rows in ``original``'s columns and dtypes, so their hashes compare."""
+    conformed = {}
+    for col in original.columns:
+        before = original[col]
+        if col not in updated.columns:
+            conformed[col] = before.reindex(updated.index)
+            continue
+        after = _as_dtype_of(updated[col], before)
+        if isinstance(before.dtype, pd.CategoricalDtype):
+            # Categoricals hash by value; casting would turn new entries into NaN
+            after = after.astype(object)
+        else:
+            try:
+                after = after.astype(before.dtype)
+            except (TypeError, ValueError):
+                pass
+        conformed[col] = after
+    return pd.DataFrame(conformed, index=updated.index)
+
+
+def grid_changes(original, updated, hashes=None):
+    """Return the :class:`RowChanges` between the rows sent to a grid and what came back.
+
+    ``hashes`` are ``original``'s row hashes when already known (e.g. from
+    the tab's load); otherwise they are computed here. Either way the grid
+    data is hashed in one vectorised pass.
+    """
+    if not _has_keys(updated, original):
+        return RowChanges(set(), set(), set())
+    if hashes is None:
+        hashes = hash_rows(original)
+    return diff_hashes(hashes, hash_rows(_conform(_grid_rows(updated, original), original)))
+
+
+def diff_cells(original, updated, rows=None):
+    """Return ``[(sheet_row, sheet_col, value)]`` for every edited cell.
+
+    ``original`` is the frame given to the grid (columns in sheet order,
+    indexed by sheet row); ``updated`` is ``grid_response["data"]``. Only
+    ``rows`` are compared when given (see :func:`grid_changes`).
+    """
+    if not _has_keys(updated, original):
+        return []
+    updated = _grid_rows(updated, original)
+    rows = original.index.intersection(updated.index if rows is None else sorted(rows))
+
+    cells = []
+    for col_num, col in enumerate(original.columns, start=1):
+        if col not in updated.columns:
+            continue
+        before = original.loc[rows, col]
+        raw = updated.loc[rows, col]
+        after = _as_dtype_of(raw, before)
+        same = (before.astype(object) == after.astype(object)) | (before.isna() & after.isna())
+        # A value the grid lost in conversion comes back as NaN; never let
+        # that blank out a cell that had something in it
+        same |= raw.isna() & before.notna()
+        for row in same.index[~same.to_numpy()]:
+            cells.append((int(row), col_num, _cell_value(raw.loc[row])))
+    return cells
+
+
+def _loaded_hashes(sheet_key, tab_name, original):
+    # The hashes kept from the tab's load fit only an untouched slice of it
+    if not load_tab(sheet_key, tab_name, copy=False).columns.equals(original.columns):
+        return None
+    hashes = get_row_hashes(sheet_key, tab_name)
+    if not original.index.isin(hashes.index).all():
+        return None
+    return hashes.loc[original.index]
+
+
+def save_grid_edits(sheet_key, tab_name, original, updated):
+    """Write only the edited cells back in one batch_update; returns the cell count."""
+    changes = grid_changes(original, updated, _loaded_hashes(sheet_key, tab_name, original))
+    if not changes.updated:
+        return 0
+    cells = diff_cells(original, updated, rows=changes.updated)
+    if not cells:
+        return 0
+    worksheet = get_worksheet(sheet_key, tab_name)
+    worksheet.batch_update(
+        [{"range": rowcol_to_a1(row, col), "values": [[value]]} for row, col, value in cells],
+        value_input_option="RAW",
+    )
+    replica.update_cells(sheet_key, tab_name, cells)
+    invalidate_tab(sheet_key, tab_name, full_sync=False, rows={row for row, _, _ in cells})
+    return len(cells)
+
+
+# --- SINGLE ROWS BY ID ---
+def _locate(sheet_key, tab_name, worksheet, row_id):
+    # The ID index is as of the last load; confirm the row hasn't moved since
+    row = find_row(sheet_key, tab_name, row_id)
+    id_col = row_id_column(sheet_key, tab_name)
+    if row is None or id_col is None:
+        raise KeyError(f"No row with ID {row_id} in {tab_name}")
+    if worksheet.cell(row, id_col).value != row_id:
+        invalidate_tab(sheet_key, tab_name)
+        raise KeyError(f"Row {row_id} moved in {tab_name}; reload and try again")
+    return row
+
+
+def update_row(sheet_key, tab_name, row_id, values):
+    """Write ``{column: value}`` into the row with ``row_id``; returns its sheet row."""
+    columns = list(load_tab(sheet_key, tab_name, copy=False).columns)
+    unknown = [col for col in values if col not in columns or col == ROW_ID]
+    if unknown:
+        raise KeyError(f"Not a column of {tab_name}: {', '.join(map(str, unknown))}")
+    worksheet = get_worksheet(sheet_key, tab_name)
+    row = _locate(sheet_key, tab_name, worksheet, row_id)
+    cells = [(row, columns.index(col) + 1, _cell_value(value)) for col, value in values.items()]
+    worksheet.batch_update(
+        [{"range": rowcol_to_a1(r, c), "values": [[value]]} for r, c, value in cells],
+        value_input_option="RAW",
+    )
+    replica.update_cells(sheet_key, tab_name, cells)
+    invalidate_tab(sheet_key, tab_name, full_sync=False, rows={row})
+    return row
+
+
+def delete_row(sheet_key, tab_name, row_id):
+    """Delete the row with ``row_id`` from the sheet; returns the sheet row it was at."""
+    worksheet = get_worksheet(sheet_key, tab_name)
+    row = _locate(sheet_key, tab_name, worksheet, row_id)
+    worksheet.delete_rows(row)
+    # Every row below moved up one; re-read the tab to renumber them
+    invalidate_tab(sheet_key, tab_name)
+    return row